@@ -0,0 +1,375 @@
+"""Reproducible performance benchmarks for every version of the game.
+
+    python benchmark.py                      # all versions x all scenarios -> benchmark.json
+    python benchmark.py -s idle heavy_fire   # a subset
+    python benchmark.py --compare old.json new.json
+
+Each (version, scenario) pair runs in its own process with a fixed seed,
+so peak memory is per run and the legacy scripts' module-level state can't
+leak between runs. defender_2 is driven through the headless World (add
+--render to include drawing). defender.py and defender_-1.py have no
+headless mode; they run their own main loop under SDL's dummy drivers with
+scripted keyboard input and a clock that never sleeps, so their numbers
+include drawing.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+VERSIONS = ["defender_-1", "defender", "defender_2", "defender_2_store"]
+LEGACY = {"defender_-1": "defender_-1.py", "defender": "defender.py"}
+
+# --- Scenarios ---
+def idle(frame):
+    return {}
+
+def patrol_fire(frame):
+    # Sweep back and forth across the world firing every frame
+    return {"fire": True, "left": (frame // 120) % 2 == 0, "right": (frame // 120) % 2 == 1}
+
+def bomb_storm(frame):
+    return {"bomb": frame % 30 == 0, "fire": frame % 4 == 0, "right": True}
+
+class SkipScenario(Exception):
+    """A version can't run a scenario; the message says why."""
+
+class Scenario:
+    def __init__(self, name, description, script=idle, frames=600, humanoids=10, landers=6,
+                 width_scale=1, refill_bombs=False, world_options=None, seed=None):
+        self.name = name
+        self.description = description
+        self.script = script
+        self.frames = frames
+        self.humanoids = humanoids
+        self.landers = landers
+        self.width_scale = width_scale # Multiple of the standard WORLD_WIDTH
+        self.refill_bombs = refill_bombs
+        self.world_options = dict(world_options or {}) # Overrides for defender_2's World
+        self.seed = seed # Overrides --seed
+
+    @classmethod
+    def from_recording(cls, path):
+        """Plays back the inputs of a replay.py recording in its original world."""
+        from replay import BUTTONS, Recording
+        recording = Recording.load(path)
+        masks = recording.inputs
+        def script(frame):
+            return {name: bool(masks[frame] & bit) for name, bit in BUTTONS}
+        options = dict(recording.world_options)
+        options.pop("use_entity_store", None) # Chosen by the version being run
+        return cls("replay:" + path, "Recorded session " + os.path.basename(path), script, frames=len(masks),
+                   world_options=options, seed=recording.seed)
+
+SCENARIOS = {s.name: s for s in [
+    Scenario("idle", "Default world, no input"),
+    Scenario("heavy_fire", "Patrolling and firing every frame", patrol_fire),
+    Scenario("mass_abduction", "60 Landers hunting 30 humanoids", idle, humanoids=30, landers=60),
+    Scenario("smart_bomb_storm", "A smart bomb every half second", bomb_storm, landers=30, refill_bombs=True),
+    Scenario("scale_10x", "10x humanoids and Landers", patrol_fire, humanoids=100, landers=60),
+    Scenario("scale_100x", "100x humanoids and Landers", patrol_fire, frames=200, humanoids=1000, landers=600),
+    Scenario("wide_world", "10x WORLD_WIDTH with 10x entities", patrol_fire, humanoids=100, landers=60, width_scale=10),
+    Scenario("waves", "Wave director, patrolling and firing through the waves", patrol_fire, frames=3600,
+             world_options={"waves": True}),
+    Scenario("huge_world", "40x WORLD_WIDTH with 400 Landers", patrol_fire, humanoids=400, landers=400, width_scale=40),
+    Scenario("huge_world_lod", "huge_world with far enemies thinking at a reduced rate", patrol_fire,
+             humanoids=400, landers=400, width_scale=40, world_options={"ai_lod": True}),
+]}
+
+# --- Measurement ---
+def percentiles(values):
+    import numpy as np
+    if not values:
+        return None
+    p50, p95, p99 = np.percentile(np.asarray(values) * 1000, (50, 95, 99))
+    return {"p50": float(p50), "p95": float(p95), "p99": float(p99)}
+
+def peak_rss_kb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak # macOS reports bytes
+
+def make_inputs(pressed):
+    from simulation import Inputs
+    return Inputs(**pressed)
+
+def run_current(scenario, frames, seed, store, render):
+    import pygame
+    from profiler import Profiler
+    from simulation import WORLD_WIDTH, World
+
+    def build():
+        options = dict(width=WORLD_WIDTH * scenario.width_scale, num_humanoids=scenario.humanoids,
+                       num_landers=scenario.landers)
+        options.update(scenario.world_options)
+        world = World(use_entity_store=store, seed=scenario.seed if scenario.seed is not None else seed, **options)
+        renderer = None
+        if render:
+            from render import Renderer
+            renderer = Renderer(pygame.display.get_surface(), world.width, seed=seed)
+        return world, renderer
+
+    def play(world, renderer):
+        clock = time.perf_counter
+        times = []
+        game_over_frame = None
+        for frame in range(frames):
+            if scenario.refill_bombs:
+                world.player.bombs = 3
+            start = clock()
+            world.step(make_inputs(scenario.script(frame)))
+            if renderer is not None:
+                renderer.draw(world)
+            times.append(clock() - start)
+            if world.game_over:
+                game_over_frame = frame + 1
+                break
+        return times, game_over_frame
+
+    pygame.init()
+    if render:
+        pygame.display.set_mode((800, 600))
+
+    # Timed run first, then the same run again under the profiler for the breakdown
+    setup_start = time.perf_counter()
+    world, renderer = build()
+    setup = time.perf_counter() - setup_start
+    times, game_over_frame = play(world, renderer)
+
+    world, renderer = build()
+    world.profiler = Profiler(window=frames)
+    if renderer is not None:
+        renderer.profiler = world.profiler
+    original_step = world.step
+    def profiled_step(inputs):
+        result = original_step(inputs)
+        world.profiler.end_frame()
+        return result
+    world.step = profiled_step
+    play(world, renderer)
+    phases = {name: {"mean": row["mean"], "p95": row["p95"]}
+              for name, row in world.profiler.summary().items()}
+    return times, game_over_frame, setup, phases
+
+def run_legacy(path, scenario, frames, seed):
+    """Runs a legacy script's own main loop with scripted input and no frame cap."""
+    import pygame
+
+    if scenario.width_scale != 1:
+        raise SkipScenario("WORLD_WIDTH is fixed when the script is loaded")
+    if scenario.world_options:
+        raise SkipScenario("World options apply to defender_2 only")
+
+    keymap = {"left": pygame.K_LEFT, "right": pygame.K_RIGHT, "up": pygame.K_UP, "down": pygame.K_DOWN}
+    state = {"frame": -1, "held": set(), "start": None, "last": None, "game_over_frame": None}
+    times = []
+    clock = time.perf_counter
+
+    class HeldKeys:
+        def __getitem__(self, key):
+            return key in state["held"]
+
+    class NoWaitClock:
+        def tick(self, framerate=0):
+            return 0
+
+        def get_fps(self):
+            return 0.0
+
+    def scripted_events(*args, **kwargs):
+        # The main loop calls event.get() exactly once per frame, from module level
+        g = sys._getframe(1).f_globals
+        now = clock()
+        if state["start"] is None:
+            state["start"] = now
+            # Top up the script's own start-up population to the scenario's
+            for _ in range(scenario.humanoids - len(g["humanoids"])):
+                h = g["Humanoid"]()
+                g["all_sprites"].add(h)
+                g["humanoids"].add(h)
+            for _ in range(scenario.landers - len(g["enemies"])):
+                e = g["Lander"]()
+                g["all_sprites"].add(e)
+                g["enemies"].add(e)
+        else:
+            times.append(now - state["last"])
+        state["frame"] += 1
+        frame = state["frame"]
+        if g.get("game_over") and state["game_over_frame"] is None:
+            state["game_over_frame"] = frame
+        if frame >= frames or state["game_over_frame"] is not None:
+            return [pygame.event.Event(pygame.QUIT)]
+
+        if scenario.refill_bombs:
+            g["player"].bombs = 3
+        pressed = scenario.script(frame)
+        state["held"] = {keymap[k] for k, down in pressed.items() if down and k in keymap}
+        events = []
+        if pressed.get("fire"):
+            events.append(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_SPACE))
+        if pressed.get("bomb"):
+            events.append(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_b))
+        state["last"] = clock()
+        return events
+
+    pygame.event.get = scripted_events
+    pygame.key.get_pressed = HeldKeys
+    pygame.time.Clock = NoWaitClock
+
+    import runpy
+    random.seed(seed)
+    load_start = clock()
+    try:
+        runpy.run_path(path, run_name="__main__")
+    except SystemExit:
+        pass
+    setup = (state["start"] or clock()) - load_start
+    return times, state["game_over_frame"], setup, None
+
+def run_one(version, scenario_name, frames, seed, render):
+    """Benchmarks one version on one scenario in this process; returns the result row."""
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    sys.path.insert(0, HERE)
+    import numpy as np
+    np.random.seed(seed)
+    if scenario_name.startswith("replay:"):
+        scenario = Scenario.from_recording(scenario_name[len("replay:"):])
+    else:
+        scenario = SCENARIOS[scenario_name]
+    frames = frames or scenario.frames
+    if scenario.seed is not None:
+        frames = min(frames, scenario.frames) # A recording has only so many inputs
+    row = {"version": version, "scenario": scenario_name, "seed": seed,
+           "includes_render": render or version in LEGACY}
+
+    try:
+        if version in LEGACY:
+            if scenario.seed is not None:
+                raise SkipScenario("recordings replay only in defender_2's World")
+            times, game_over_frame, setup, phases = run_legacy(os.path.join(HERE, LEGACY[version]), scenario, frames, seed)
+        elif version.endswith("_store") and scenario.world_options.get("ai_lod"):
+            raise SkipScenario("ai_lod needs sprite enemies")
+        else:
+            times, game_over_frame, setup, phases = run_current(scenario, frames, seed, version.endswith("_store"), render)
+    except SkipScenario as e:
+        row["skipped"] = str(e)
+        return row
+
+    seconds = sum(times)
+    row.update({
+        "frames": len(times),
+        "seconds": seconds,
+        "fps": len(times) / seconds if seconds else None,
+        "frame_ms": percentiles(times),
+        "setup_ms": setup * 1000,
+        "game_over_frame": game_over_frame,
+        "peak_rss_kb": peak_rss_kb(),
+        "phases_ms": phases,
+    })
+    return row
+
+# --- Driver ---
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_all(versions, scenarios, frames, seed, render, timeout):
+    results = []
+    for scenario in scenarios:
+        for version in versions:
+            command = [sys.executable, os.path.abspath(__file__), "--worker", version, scenario,
+                       "--seed", str(seed)]
+            if frames:
+                command += ["--frames", str(frames)]
+            if render:
+                command.append("--render")
+            try:
+                done = subprocess.run(command, capture_output=True, text=True, timeout=timeout)
+                lines = done.stdout.strip().splitlines()
+                if done.returncode != 0 or not lines:
+                    error = (done.stderr.strip().splitlines() or ["exit code %d" % done.returncode])[-1]
+                    row = {"version": version, "scenario": scenario, "error": error}
+                else:
+                    row = json.loads(lines[-1])
+            except subprocess.TimeoutExpired:
+                row = {"version": version, "scenario": scenario, "error": f"timed out after {timeout} s"}
+            results.append(row)
+            print_row(row)
+    return results
+
+def print_row(row):
+    name = f"{row['scenario']:<17} {row['version']:<17}"
+    if "error" in row or "skipped" in row:
+        print(f"{name} {row.get('error') or 'skipped: ' + row['skipped']}")
+        return
+    ms = row["frame_ms"] or {"p50": 0, "p99": 0}
+    over = f"  game over @{row['game_over_frame']}" if row["game_over_frame"] else ""
+    print(f"{name} {row['fps']:9.1f} fps  p50 {ms['p50']:7.3f} ms  p99 {ms['p99']:7.3f} ms  "
+          f"{row['peak_rss_kb'] / 1024:6.1f} MB{over}")
+
+def compare(old_path, new_path):
+    """Prints the fps change for every row present in both result files."""
+    def load(path):
+        with open(path) as f:
+            data = json.load(f)
+        return data["meta"], {(r["version"], r["scenario"]): r for r in data["results"] if "fps" in r}
+    old_meta, old = load(old_path)
+    new_meta, new = load(new_path)
+    print(f"{old_meta.get('commit')} -> {new_meta.get('commit')}")
+    for key in sorted(old.keys() & new.keys(), key=lambda k: (k[1], k[0])):
+        a = old[key]["fps"]
+        b = new[key]["fps"]
+        print(f"{key[1]:<17} {key[0]:<17} {a:9.1f} -> {b:9.1f} fps ({(b / a - 1) * 100:+6.1f}%)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-v", "--versions", nargs="+", choices=VERSIONS, default=VERSIONS)
+    parser.add_argument("-s", "--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--frames", type=int, default=0, help="override every scenario's frame count")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--render", action="store_true", help="include drawing for defender_2")
+    parser.add_argument("--timeout", type=float, default=600, help="seconds allowed per run")
+    parser.add_argument("-o", "--out", default="benchmark.json")
+    parser.add_argument("--replay", nargs="+", default=[], metavar="RECORDING",
+                        help="also run the inputs of replay.py recordings")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    parser.add_argument("--worker", nargs=2, metavar=("VERSION", "SCENARIO"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    if args.worker:
+        print(json.dumps(run_one(args.worker[0], args.worker[1], args.frames, args.seed, args.render)))
+        return
+
+    import numpy as np
+    import pygame
+    meta = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "seed": args.seed,
+        "render": args.render,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pygame": pygame.version.ver,
+        "platform": platform.platform(),
+        "scenarios": {name: SCENARIOS[name].description for name in args.scenarios},
+    }
+    scenarios = args.scenarios + ["replay:" + os.path.abspath(path) for path in args.replay]
+    results = run_all(args.versions, scenarios, args.frames, args.seed, args.render, args.timeout)
+    with open(args.out, "w") as f:
+        json.dump({"meta": meta, "results": results}, f, indent=2)
+    print(f"Results written to {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""Off-screen rendering into NumPy arrays, for vision agents and visual regression.
+
+    capture = FrameCapture(world.width, size=(84, 84), grayscale=True, stack=4, seed=0)
+    world.step(inputs)
+    pixels = capture.capture(world)   # (4, 84, 84) uint8, oldest frame first
+
+    python capture.py --seed 1 --frames 600 --every 60 --save shots/     # write reference PNGs
+    python capture.py --seed 1 --frames 600 --every 60 --compare shots/  # check against them
+
+The scene is drawn by the normal Renderer onto a Surface built over a
+preallocated array, so the array *is* the picture: no display, no copy and
+no surface lock. Scaled, grayscale and stacked observations are written
+into buffers made once up front, so a capture allocates nothing. Returned
+arrays are views of those buffers and change on the next capture.
+"""
+import argparse
+import os
+import sys
+import numpy as np
+import pygame
+
+from render import Renderer
+from replay import Recording, unpack_inputs
+from simulation import SCREEN_WIDTH, SCREEN_HEIGHT, WORLD_WIDTH, World
+from vector_env import NUM_ACTIONS
+
+# ITU-R 601 luma weights in 1/256ths
+GRAY_WEIGHTS = (77, 150, 29)
+
+# Observations of PixelDefenderEnv: the last PIXEL_STACK grayscale frames at PIXEL_SIZE
+PIXEL_SIZE = (84, 84)
+PIXEL_STACK = 4
+PIXEL_SHAPE = (PIXEL_STACK, PIXEL_SIZE[1], PIXEL_SIZE[0])
+
+def array_surface(width, height):
+    """A (height, width, 4) uint8 array and an RGBX Surface that draws straight into it."""
+    array = np.zeros((height, width, 4), dtype=np.uint8)
+    return array, pygame.image.frombuffer(array, (width, height), "RGBX")
+
+# --- Frame Capture ---
+class FrameCapture:
+    """Renders a World off-screen and turns the frame into an observation array.
+
+    `size` (width, height) smooth-scales the frame, `grayscale` reduces it to
+    one channel, and `stack` keeps the last that many observations. Frames
+    are (height, width, 3), or (height, width) in grayscale; a stack adds a
+    leading axis with the newest frame last.
+    """
+    def __init__(self, world_width=WORLD_WIDTH, size=None, grayscale=False, stack=1, seed=None,
+                 **renderer_options):
+        if not pygame.font.get_init():
+            pygame.font.init() # The HUD needs fonts even without a display
+        self.frame, self.surface = array_surface(SCREEN_WIDTH, SCREEN_HEIGHT)
+        self.pixels = self.frame[:, :, :3] # Full-size RGB view of the render target
+        renderer_options.setdefault("game_clock", True) # Same state, same pixels
+        self.renderer = Renderer(self.surface, world_width, seed=seed, **renderer_options)
+
+        self.size = tuple(size) if size is not None else (SCREEN_WIDTH, SCREEN_HEIGHT)
+        self.grayscale = grayscale
+        self.stack = stack
+        width, height = self.size
+        self._scaled = self.frame
+        if self.size != (SCREEN_WIDTH, SCREEN_HEIGHT):
+            self._scaled, self._scaled_surface = array_surface(width, height)
+        if grayscale:
+            self._luma = np.zeros((height, width), dtype=np.uint16)
+            self._term = np.zeros((height, width), dtype=np.uint16)
+        shape = (height, width) if grayscale else (height, width, 3)
+
+        # Each observation goes into slot i and slot i + stack, so the last
+        # `stack` frames are always the contiguous run starting after slot i
+        self._frames = np.zeros((2 * stack,) + shape, dtype=np.uint8)
+        self._next = 0
+        self._empty = True
+        self.captures = 0
+
+    def reset(self):
+        """Starts a new episode: the next capture fills the whole stack."""
+        self._empty = True
+
+    def render(self, world, alpha=1.0):
+        """Draws the world into `frame`/`pixels` and returns the full-size RGB view."""
+        self.renderer.draw(world, alpha)
+        return self.pixels
+
+    def capture(self, world, alpha=1.0):
+        """Renders the world and returns the current observation (a view, see module docs)."""
+        self.renderer.draw(world, alpha)
+        self.captures += 1
+        return self.observe()
+
+    def observe(self):
+        """Processes the frame already drawn into the observation buffers and returns it."""
+        scaled = self._scaled
+        if scaled is not self.frame:
+            pygame.transform.smoothscale(self.surface, self.size, self._scaled_surface)
+
+        slot = self._frames[self._next]
+        if self.grayscale:
+            luma = self._luma
+            term = self._term
+            np.multiply(scaled[:, :, 0], GRAY_WEIGHTS[0], out=luma, dtype=np.uint16)
+            for channel in (1, 2):
+                np.multiply(scaled[:, :, channel], GRAY_WEIGHTS[channel], out=term, dtype=np.uint16)
+                luma += term
+            np.right_shift(luma, 8, out=slot, casting="unsafe")
+        else:
+            np.copyto(slot, scaled[:, :, :3])
+
+        stack = self.stack
+        frames = self._frames
+        if self._empty:
+            for i in range(2 * stack): # An episode starts with its first frame repeated
+                if i != self._next:
+                    np.copyto(frames[i], slot)
+            self._empty = False
+        else:
+            np.copyto(frames[self._next + stack], slot)
+        self._next = (self._next + 1) % stack
+        if stack == 1:
+            return frames[0]
+        return frames[self._next:self._next + stack]
+
+# --- Pixel Environment ---
+class PixelDefenderEnv:
+    """VectorDefenderEnv's API, observing the rendered game instead of features.
+
+    WorldBatch keeps no sprites to draw, so each game here is a World of its
+    own, stepped in turn and drawn by its own FrameCapture (about 2 MB for
+    the full-size frame; renderer caches such as the terrain tiles are per
+    world). Observations are uint8 arrays
+    of PIXEL_SHAPE, oldest frame first. Rewards, episode ends, seeding and
+    infos follow VectorDefenderEnv; pass `observations` to have them
+    written into an array of your own (e.g. over shared memory).
+    """
+    num_actions = NUM_ACTIONS
+    observation_shape = PIXEL_SHAPE
+
+    def __init__(self, num_envs, seed=None, max_steps=None, observations=None, **world_options):
+        self.num_envs = num_envs
+        self.max_steps = max_steps
+        self.world_options = world_options
+        self.seed_rng = np.random.default_rng(seed)
+        self.shared = observations is not None
+        if observations is None:
+            observations = np.empty((num_envs,) + PIXEL_SHAPE, dtype=np.uint8)
+        self.observations = observations
+        self.worlds = [None] * num_envs
+        self.seeds = np.zeros(num_envs, dtype=np.int64)
+        width = world_options.get("width", WORLD_WIDTH)
+        self.captures = [FrameCapture(width, PIXEL_SIZE, grayscale=True, stack=PIXEL_STACK, seed=i)
+                         for i in range(num_envs)]
+        self.episode_steps = np.zeros(num_envs, dtype=np.int64)
+        self.episode_returns = np.zeros(num_envs, dtype=np.int64)
+
+    def reset(self, seed=None):
+        if seed is not None:
+            self.seed_rng = np.random.default_rng(seed)
+        for i in range(self.num_envs):
+            self.reset_game(i)
+        return self.observe(), {"seed": self.seeds.copy()}
+
+    def observe(self):
+        return self.observations if self.shared else self.observations.copy()
+
+    def reset_game(self, i):
+        seed = int(self.seed_rng.integers(2**31))
+        self.seeds[i] = seed
+        world = self.worlds[i] = World(seed=seed, **self.world_options)
+        capture = self.captures[i]
+        capture.reset()
+        self.observations[i] = capture.capture(world)
+        self.episode_steps[i] = 0
+        self.episode_returns[i] = 0
+
+    def step(self, actions):
+        rewards = np.zeros(self.num_envs, dtype=np.float32)
+        terminated = np.zeros(self.num_envs, dtype=bool)
+        for i, mask in enumerate(np.asarray(actions).tolist()):
+            world = self.worlds[i]
+            score = world.score
+            world.step(unpack_inputs(mask))
+            rewards[i] = world.score - score
+            terminated[i] = world.game_over
+            self.observations[i] = self.captures[i].capture(world)
+        self.episode_steps += 1
+        self.episode_returns += rewards.astype(np.int64)
+        if self.max_steps is not None:
+            truncated = ~terminated & (self.episode_steps >= self.max_steps)
+        else:
+            truncated = np.zeros(self.num_envs, dtype=bool)
+
+        infos = {"seed": self.seeds.copy()}
+        finished = np.flatnonzero(terminated | truncated)
+        if len(finished):
+            infos["final_observation"] = self.observations[finished]
+            infos["finished"] = finished
+            infos["episode_return"] = self.episode_returns[finished].copy()
+            infos["episode_length"] = self.episode_steps[finished].copy()
+            for i in finished.tolist():
+                self.reset_game(i)
+        return self.observe(), rewards, terminated, truncated, infos
+
+# --- Visual Regression ---
+def run(args):
+    if args.recording:
+        recording = Recording.load(args.recording)
+        world = recording.make_world()
+        inputs = recording.inputs
+    else:
+        world = World(seed=args.seed)
+        inputs = np.random.default_rng(args.seed).integers(0, 64, args.frames).astype(np.uint8).tobytes()
+    capture = FrameCapture(world.width, seed=world.seed)
+
+    differing = 0
+    shots = 0
+    for step, mask in enumerate(inputs[:args.frames], 1):
+        world.step(unpack_inputs(mask))
+        if step % args.every:
+            continue
+        capture.render(world)
+        shots += 1
+        name = f"frame_{step:05d}.png"
+        if args.save:
+            pygame.image.save(capture.surface, os.path.join(args.save, name))
+        if args.compare:
+            reference = pygame.surfarray.pixels3d(pygame.image.load(os.path.join(args.compare, name)))
+            changed = int(np.count_nonzero((reference.swapaxes(0, 1) != capture.pixels).any(axis=2)))
+            if changed:
+                differing += 1
+                print(f"{name}: {changed} pixels differ")
+    print(f"{shots} frames captured" + (f", {differing} differ from {args.compare}" if args.compare else ""))
+    return differing
+
+def main():
+    parser = argparse.ArgumentParser(description="Render a seeded game off-screen and save or check frames")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--every", type=int, default=60, help="capture one frame per this many steps")
+    parser.add_argument("--recording", help="drive the game from an input recording instead of random inputs")
+    parser.add_argument("--save", metavar="DIR", help="write the captured frames as PNGs")
+    parser.add_argument("--compare", metavar="DIR", help="compare against PNGs written by --save")
+    args = parser.parse_args()
+
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    pygame.init()
+    if args.save:
+        os.makedirs(args.save, exist_ok=True)
+    if run(args):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
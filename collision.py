@@ -0,0 +1,106 @@
+import numpy as np
+
+# Below this many candidate pairs a dense all-pairs test beats sorting
+DENSE_PAIR_LIMIT = 4096
+
+def box_arrays(sprites):
+    """Returns the world-space centers and half-extents of sprites as arrays."""
+    if not sprites:
+        empty = np.empty(0)
+        return empty, empty, empty, empty
+    boxes = np.array([(s.world_x, s.world_y, s.rect.width, s.rect.height) for s in sprites], dtype=np.float64)
+    return boxes[:, 0], boxes[:, 1], boxes[:, 2] / 2, boxes[:, 3] / 2
+
+class SweepIndex:
+    """A world-space broad phase over axis-aligned boxes.
+
+    Boxes are sorted by world_x once per build; each query then binary
+    searches the x interval it could possibly touch, so the work grows with
+    the number of real neighbours instead of with the size of both groups.
+    Small queries skip the sort and test all pairs in one vector op. The x
+    axis wraps at `world_width`, matching the scrolling world.
+    """
+    def __init__(self, world_width):
+        self.world_width = world_width
+        self.build(np.empty(0), np.empty(0), np.empty(0), np.empty(0))
+
+    def __len__(self):
+        return len(self._xs)
+
+    def build(self, xs, ys, half_ws, half_hs):
+        """Indexes a new set of boxes, replacing the previous one."""
+        xs = np.mod(np.asarray(xs, dtype=np.float64), self.world_width)
+        self._order = None # Sorted lazily, only if a query is big enough to need it
+        self._xs = xs
+        self._ys = np.asarray(ys, dtype=np.float64)
+        self._half_ws = np.asarray(half_ws, dtype=np.float64)
+        self._half_hs = np.asarray(half_hs, dtype=np.float64)
+        self._max_half_w = float(self._half_ws.max()) if len(xs) else 0.0
+
+    def query_pairs(self, xs, ys, half_ws, half_hs):
+        """Finds every overlapping (query, item) pair.
+
+        Returns two index arrays: positions in the query arrays and positions
+        in the indexed arrays, sorted by query then item.
+        """
+        empty = np.empty(0, dtype=np.intp)
+        xs = np.asarray(xs, dtype=np.float64)
+        if not len(xs) or not len(self._xs):
+            return empty, empty
+        width = self.world_width
+        xs = np.mod(xs, width)
+        ys = np.asarray(ys, dtype=np.float64)
+        if np.ndim(half_ws) == 0:
+            half_ws = np.full(xs.shape, half_ws, dtype=np.float64)
+        if np.ndim(half_hs) == 0:
+            half_hs = np.full(xs.shape, half_hs, dtype=np.float64)
+
+        if len(xs) * len(self._xs) <= DENSE_PAIR_LIMIT:
+            return self._dense_pairs(xs, ys, half_ws, half_hs)
+        if self._order is None:
+            self._order = np.argsort(self._xs, kind="stable")
+            self._sorted_xs = self._xs[self._order]
+
+        # Queries hanging over either edge also search the far side of the world
+        reach = half_ws + self._max_half_w
+        query = np.arange(len(xs))
+        left = query[xs - reach < 0]
+        right = query[xs + reach > width]
+        query = np.concatenate((query, left, right))
+        qx = np.concatenate((xs, xs[left] + width, xs[right] - width))
+        reach = reach[query]
+
+        lo = np.searchsorted(self._sorted_xs, qx - reach, side="left")
+        hi = np.searchsorted(self._sorted_xs, qx + reach, side="right")
+        counts = hi - lo
+        total = int(counts.sum())
+        if not total:
+            return empty, empty
+
+        # Expand each query's [lo, hi) slice into candidate pairs
+        starts = np.repeat(lo - (np.cumsum(counts) - counts), counts)
+        item = self._order[starts + np.arange(total)]
+        q_pos = np.repeat(np.arange(len(query)), counts)
+        q = query[q_pos]
+
+        hit = (np.abs(qx[q_pos] - self._xs[item]) < half_ws[q] + self._half_ws[item]) & \
+              (np.abs(ys[q] - self._ys[item]) < half_hs[q] + self._half_hs[item])
+        q = q[hit]
+        item = item[hit]
+
+        # A wrapped copy can reach a box the original already touched; keep each pair once
+        keys = np.unique(q * len(self._xs) + item)
+        return keys // len(self._xs), keys % len(self._xs)
+
+    def _dense_pairs(self, xs, ys, half_ws, half_hs):
+        width = self.world_width
+        dx = np.abs((xs[:, None] - self._xs[None, :] + width / 2) % width - width / 2)
+        dy = np.abs(ys[:, None] - self._ys[None, :])
+        hit = (dx < half_ws[:, None] + self._half_ws[None, :]) & \
+              (dy < half_hs[:, None] + self._half_hs[None, :])
+        return np.nonzero(hit)
+
+    def query_box(self, x, y, half_w, half_h):
+        """Returns the indexes of every box overlapping one query box, in index order."""
+        _, items = self.query_pairs(np.array([x]), np.array([y]), half_w, half_h)
+        return items
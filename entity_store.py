@@ -0,0 +1,359 @@
+import math
+import numpy as np
+
+# --- Storage ---
+class EntityTable:
+    """Growable structure-of-arrays storage for one entity type.
+
+    Each field is a NumPy column; rows are packed into [0, count).
+    Removing a row moves the last row into the gap. With `ordered` set rows
+    stay in the order they were added instead: a removed row is only marked
+    dead, and `compact` drops all dead rows in one pass, so killing many
+    rows at once costs one sweep rather than one per row. `owners` (the
+    sprite wrapper for each row) is kept in step and told its new row.
+    """
+    def __init__(self, fields, capacity=64, ordered=False):
+        self.fields = dict(fields)
+        self.ordered = ordered
+        self.count = 0
+        self.capacity = capacity
+        self.columns = {name: np.zeros(capacity, dtype=dtype) for name, dtype in self.fields.items()}
+        self.owners = []
+        self.alive = np.zeros(capacity, dtype=bool) # False for rows removed since the last compact
+        self.dead = 0
+
+    def __len__(self):
+        return self.count
+
+    def reserve(self, capacity):
+        """Grows every column so at least `capacity` rows fit without reallocating."""
+        if capacity <= self.capacity:
+            return
+        for name, column in self.columns.items():
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:self.count] = column[:self.count]
+            self.columns[name] = grown
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:self.count] = self.alive[:self.count]
+        self.alive = alive
+        self.capacity = capacity
+
+    def add(self, owner):
+        """Appends a zeroed row owned by `owner` and returns its index."""
+        if self.count == self.capacity:
+            self.reserve(self.capacity * 2)
+        row = self.count
+        for column in self.columns.values():
+            column[row] = 0
+        self.alive[row] = True
+        self.owners.append(owner)
+        self.count += 1
+        return row
+
+    def remove(self, row):
+        """Deletes a row, filling the gap with the last row, or (`ordered`) marks it for `compact`."""
+        if self.ordered:
+            self.alive[row] = False
+            self.dead += 1
+            return
+        last = self.count - 1
+        owners = self.owners
+        if row != last:
+            for column in self.columns.values():
+                column[row] = column[last]
+            moved = owners[last]
+            owners[row] = moved
+            moved._row = row
+        owners.pop()
+        self.count -= 1
+
+    def compact(self):
+        """Drops the rows removed since the last call, keeping the rest in order."""
+        if not self.dead:
+            return
+        count = self.count
+        keep = self.alive[:count]
+        survivors = np.flatnonzero(keep)
+        live = len(survivors)
+        for column in self.columns.values():
+            column[:live] = column[:count][keep]
+        # Rows before the first dead one stay where they are
+        first = int(np.argmin(keep))
+        moved = [self.owners[i] for i in survivors[first:].tolist()]
+        for row, owner in enumerate(moved, first):
+            owner._row = row
+        self.owners[first:] = moved
+        self.alive[:live] = True
+        self.alive[live:count] = False
+        self.count = live
+        self.dead = 0
+
+    def row_values(self, row):
+        return {name: column[row].item() for name, column in self.columns.items()}
+
+    def view(self, name):
+        """The live part of one column. Writes go straight to storage."""
+        return self.columns[name][:self.count]
+
+class Column:
+    """Exposes one field of the owner's table row as a plain attribute."""
+    def __init__(self, field):
+        self.field = field
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        table = obj._table
+        if table is None:
+            return obj._detached[self.field]
+        return table.columns[self.field][obj._row].item()
+
+    def __set__(self, obj, value):
+        table = obj._table
+        if table is None:
+            obj._detached[self.field] = value
+        else:
+            table.columns[self.field][obj._row] = value
+
+class ArrayBacked:
+    """Mixin for sprites whose state lives in an EntityTable row.
+
+    A killed sprite keeps a copy of its last values, so code that reads
+    `hit.world_x` right after killing it still works.
+    """
+    _table = None
+    _row = -1
+
+    def _bind(self, table):
+        self._table = table
+        self._row = table.add(self)
+
+    def kill(self):
+        table = self._table
+        if table is not None:
+            self._detached = table.row_values(self._row)
+            table.remove(self._row)
+            self._table = None
+        super().kill()
+
+# --- Batched Update ---
+def hypot(dx, dy):
+    """math.hypot over arrays. np.hypot can differ from it in the last bit, and
+    the sprites use math.hypot, so this keeps the two in step."""
+    return np.fromiter(map(math.hypot, dx.tolist(), dy.tolist()), dtype=np.float64, count=len(dx))
+
+LASER_FIELDS = {"x": np.float64, "y": np.float64, "speed_x": np.float64, "direction": np.int8}
+LANDER_FIELDS = {
+    "x": np.float64, "y": np.float64, "vx": np.float64, "vy": np.float64,
+    "target": np.int64, "has_humanoid": np.bool_,
+}
+MUTANT_FIELDS = {"x": np.float64, "y": np.float64, "speed": np.float64}
+
+class EntityStore:
+    """Array storage and vectorized AI for Lasers, Landers and Mutants.
+
+    Sprites created through the World's spawn helpers are thin wrappers over
+    rows here, so the rest of the game can still treat them as sprites. One
+    call to `update` moves every stored entity with a handful of vector ops;
+    only the rare state changes (abductions, escapes, deaths) drop back to
+    Python. Lander and Mutant rows stay in spawn order, the order sprite mode
+    updates them in, since that decides who wins a contested humanoid; the
+    World calls `compact` after each phase that can kill them.
+    """
+    def __init__(self, wrap_height, capacity=64):
+        self.wrap_height = wrap_height # Mutants leaving the top reappear at the bottom
+        self.lasers = EntityTable(LASER_FIELDS, capacity)
+        self.landers = EntityTable(LANDER_FIELDS, capacity, ordered=True)
+        self.mutants = EntityTable(MUTANT_FIELDS, capacity, ordered=True)
+
+    def compact(self):
+        """Drops the Lander and Mutant rows killed since the last call."""
+        self.landers.compact()
+        self.mutants.compact()
+
+    def humanoid_lookup(self, world):
+        """Returns (row_of_uid, xs, ys, abducted, uids) arrays for the live humanoids."""
+        humanoids = world.humanoids.sprites()
+        n = len(humanoids)
+        row_of_uid = np.full(world.next_uid, -1, dtype=np.intp)
+        uids = np.fromiter((h.uid for h in humanoids), dtype=np.intp, count=n)
+        row_of_uid[uids] = np.arange(n)
+        xs = np.fromiter((h.world_x for h in humanoids), dtype=np.float64, count=n)
+        ys = np.fromiter((h.world_y for h in humanoids), dtype=np.float64, count=n)
+        abducted = np.fromiter((h.is_abducted for h in humanoids), dtype=bool, count=n)
+        return row_of_uid, xs, ys, abducted, uids
+
+    def assign_lander_targets(self, world):
+        """Vectorized World.assign_lander_targets over the lander table."""
+        t = self.landers
+        if not t.count:
+            return
+        row_of_uid, hxs, hys, abducted, uids = self.humanoid_lookup(world)
+        target = t.view("target")
+        rows = np.where(target >= 0, row_of_uid[np.maximum(target, 0)], -1)
+        valid = (rows >= 0) & ~abducted[np.maximum(rows, 0)] if len(uids) else np.zeros(t.count, dtype=bool)
+        searching = ~t.view("has_humanoid") & ~valid
+        target[searching] = -1
+        if not searching.any():
+            return
+
+        available = np.flatnonzero(~abducted)
+        if not len(available):
+            return
+        chased = np.zeros(len(uids), dtype=bool)
+        chased[rows[valid & ~t.view("has_humanoid")]] = True
+        seekers = np.flatnonzero(searching)
+        picks = world.targeting.assign(
+            t.view("x")[seekers], t.view("y")[seekers],
+            hxs[available], hys[available], chased[available],
+        )
+        found = picks >= 0
+        target[seekers[found]] = uids[available[picks[found]]]
+
+    def boxes(self, *tables):
+        """Returns (owners, xs, ys, half_ws, half_hs) for every row of the given tables.
+
+        All rows of a table share one sprite size, so the half-extents are
+        read from the first owner's rect.
+        """
+        owners = []
+        parts = []
+        for t in tables:
+            if not t.count:
+                continue
+            owners.extend(t.owners)
+            rect = t.owners[0].rect
+            parts.append((t.view("x"), t.view("y"),
+                          np.full(t.count, rect.width / 2), np.full(t.count, rect.height / 2)))
+        if not parts:
+            empty = np.empty(0)
+            return owners, empty, empty, empty, empty
+        return (owners,) + tuple(np.concatenate(column) for column in zip(*parts))
+
+    def update(self, world):
+        """Advances every stored entity by one frame."""
+        profiler = world.profiler
+        with profiler.scope("update.lasers"):
+            self.update_lasers(world)
+        with profiler.scope("update.mutants"):
+            self.update_mutants(world)
+        with profiler.scope("update.landers"):
+            self.update_landers(world)
+        self.compact() # Escaped Landers, before the collisions read the tables
+
+    def update_lasers(self, world):
+        t = self.lasers
+        x = t.view("x")
+        x += t.view("speed_x")
+        # Remove laser if it goes off-world
+        gone = np.flatnonzero((x < -100) | (x > world.width + 100))
+        self._kill_rows(t, gone)
+
+    def update_mutants(self, world):
+        t = self.mutants
+        if not t.count:
+            return
+        x = t.view("x")
+        y = t.view("y")
+        # Simple homing behavior
+        dx = world.player.world_x - x
+        dy = world.player.world_y - y
+        dist = hypot(dx, dy)
+        moving = dist > 0
+        speed = t.view("speed")
+        # Same operation order as Mutant.update, so both modes round alike
+        x += np.divide(dx, dist, out=np.zeros_like(dist), where=moving) * speed
+        y += np.divide(dy, dist, out=np.zeros_like(dist), where=moving) * speed
+
+        # World wrapping
+        x[x < 0] = world.width
+        x[x > world.width] = 0
+        y[y < 0] = self.wrap_height
+        y[y > self.wrap_height] = 0
+
+    def update_landers(self, world):
+        t = self.landers
+        if not t.count:
+            return
+        x = t.view("x")
+        y = t.view("y")
+        target = t.view("target")
+        has_humanoid = t.view("has_humanoid")
+        row_of_uid, hxs, hys, abducted, uids = self.humanoid_lookup(world)
+        rows = np.where(target >= 0, row_of_uid[np.maximum(target, 0)], -1)
+
+        # STATE 1: ASCENDING (highest priority)
+        carrying = has_humanoid & (rows >= 0)
+        dropped = has_humanoid & (rows < 0) # Target was killed
+        has_humanoid[dropped] = False
+        target[dropped] = -1
+        y[carrying] -= 2
+        ascending = np.flatnonzero(carrying)
+        for i in ascending.tolist():
+            h = world.humanoids_by_uid[int(target[i])]
+            h.world_x = float(x[i])
+            h.world_y = float(y[i]) + 25
+
+        # STATE 2: targets were assigned at the start of the frame; drop any
+        # that were abducted since. A Lander that just dropped its humanoid
+        # sits this frame out
+        idle = ~has_humanoid & ~dropped
+        if len(uids):
+            lost = idle & (rows >= 0) & abducted[np.maximum(rows, 0)]
+        else:
+            lost = idle & (rows >= 0)
+        target[lost | (idle & (rows < 0))] = -1
+        pursuing = idle & (target >= 0)
+        wandering = idle & (target < 0)
+
+        # STATE 3a: PURSUE
+        chase = np.flatnonzero(pursuing)
+        if len(chase):
+            trow = rows[chase]
+            dx = hxs[trow] - x[chase]
+            dy = hys[trow] - y[chase]
+
+            # Check for successful abduction. Sprite mode runs the Landers one
+            # at a time, so the first in order to reach a contested humanoid
+            # wins it and the ones after it have lost their target this frame
+            grab = (np.abs(dx) < 15) & (np.abs(dy) < 15)
+            if grab.any():
+                grab_rows, first = np.unique(trow[grab], return_index=True)
+                winners = chase[grab][first]
+                winner_of = np.full(len(uids), t.count, dtype=np.intp)
+                winner_of[grab_rows] = winners
+                beaten = chase > winner_of[trow]
+                if beaten.any():
+                    target[chase[beaten]] = -1
+                    wandering[chase[beaten]] = True
+                    keep = ~beaten
+                    chase, trow, dx, dy = chase[keep], trow[keep], dx[keep], dy[keep]
+                for i, r in zip(winners.tolist(), grab_rows.tolist()):
+                    has_humanoid[i] = True
+                    world.humanoids_by_uid[int(uids[r])].is_abducted = True
+
+            x[chase] += np.where(np.abs(dx) > 5, np.where(dx > 0, 2.5, -2.5), 0.0)
+            y[chase] += np.where(np.abs(dy) > 5, np.where(dy > 0, 2.0, -2.0), 0.0)
+
+        # STATE 3b: WANDER
+        vx = t.view("vx")
+        vy = t.view("vy")
+        x[wandering] += vx[wandering]
+        y[wandering] += vy[wandering]
+        # Bounce off side and top boundaries, but not ground
+        bounce_x = wandering & ((x <= 0) | (x >= world.width))
+        vx[bounce_x] *= -1
+        bounce_y = wandering & (y <= 80)
+        vy[bounce_y] = np.abs(vy[bounce_y])
+
+        # Escaped to top: the humanoid is lost and a Mutant takes the Lander's place
+        escaped = np.flatnonzero(carrying & (y < 0))
+        for lander in [t.owners[i] for i in escaped.tolist()]:
+            world.spawn_mutant(lander.world_x, lander.world_y)
+            lander.target_humanoid.kill()
+            lander.kill()
+
+    def _kill_rows(self, table, rows):
+        # Resolve owners first; each kill moves rows around
+        for owner in [table.owners[i] for i in rows.tolist()]:
+            owner.kill()
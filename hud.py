@@ -0,0 +1,66 @@
+from sprites import display_format
+
+class TextCache:
+    """Rendered text surfaces keyed by (text, color).
+
+    A string is rasterized the first time it is drawn and reused until it
+    changes. The cache is emptied when it grows past `limit` entries so
+    strings that are never shown again don't pile up.
+    """
+    def __init__(self, font, limit=256):
+        self.font = font
+        self.limit = limit
+        self._surfaces = {}
+        self.renders = 0 # font.render calls so far
+
+    def get(self, text, color):
+        key = (text, color)
+        surface = self._surfaces.get(key)
+        if surface is None:
+            if len(self._surfaces) >= self.limit:
+                self._surfaces.clear()
+            surface = self._surfaces[key] = display_format(self.font.render(text, True, color))
+            self.renders += 1
+        return surface
+
+class GlyphAtlas:
+    """Pre-rendered single characters for fields that change every frame.
+
+    Digits are drawn glyph by glyph, each advanced by its own width, so a
+    changing score costs a few blits and no font rendering.
+    """
+    def __init__(self, font, color, chars="0123456789-"):
+        self.glyphs = {c: display_format(font.render(c, True, color)) for c in chars}
+        self.advance = {c: font.size(c)[0] for c in chars}
+
+    def draw(self, surface, text, x, y):
+        glyphs = self.glyphs
+        advance = self.advance
+        blits = []
+        for c in text:
+            blits.append((glyphs[c], (x, y)))
+            x += advance[c]
+        surface.blits(blits, doreturn=False)
+        return x
+
+class Hud:
+    """Text drawing for the heads-up display."""
+    def __init__(self, font):
+        self.font = font
+        self.text = TextCache(font)
+        self._atlases = {}
+
+    def atlas(self, color):
+        atlas = self._atlases.get(color)
+        if atlas is None:
+            atlas = self._atlases[color] = GlyphAtlas(self.font, color)
+        return atlas
+
+    def draw_text(self, surface, text, x, y, color):
+        surface.blit(self.text.get(text, color), (x, y))
+
+    def draw_field(self, surface, label, digits, x, y, color):
+        """Draws a cached label followed by `digits` from the glyph atlas."""
+        label_surface = self.text.get(label, color)
+        surface.blit(label_surface, (x, y))
+        self.atlas(color).draw(surface, digits, x + label_surface.get_width(), y)
@@ -0,0 +1,67 @@
+from operator import attrgetter
+
+LOD_PERIOD = 4 # Frames between turns for an enemy far from the camera
+NEAR_MARGIN = 400 # Pixels past either screen edge where enemies still think every frame
+
+class AIScheduler:
+    """Level-of-detail scheduling for enemy AI.
+
+    Enemies within `margin` of the camera window update every frame; the
+    rest get a turn every `period` frames and move that many frames' worth
+    in one call (`update(steps)`). An enemy can shorten its own interval
+    through `far_steps`, which is how a Lander about to grab a humanoid or
+    to escape off the top still does so on the exact frame. Turns are kept
+    in per-frame buckets, so a frame only touches the enemies due in it:
+    the near ones plus about 1/period of the far ones.
+
+    Far enemies take their turns on the frames matching their spawn number
+    modulo `period`, so they are spread evenly over the period. Each enemy
+    carries its schedule (`next_update`, `update_steps`, `lod_order`), so a
+    snapshot can restore it with `rebuild`.
+    """
+    def __init__(self, view_width, period=LOD_PERIOD, margin=NEAR_MARGIN):
+        self.view_width = view_width
+        self.period = period
+        self.margin = margin
+        self.buckets = {} # Frame -> enemies whose turn it is
+        self.spawned = 0
+
+    def add(self, enemy, frame):
+        """Schedules a newly spawned enemy for the next frame."""
+        enemy.lod_order = self.spawned # Due enemies run in spawn order; also picks the far phase
+        self.spawned += 1
+        self.schedule(enemy, frame + 1, 1)
+
+    def schedule(self, enemy, frame, steps):
+        enemy.next_update = frame
+        enemy.update_steps = steps
+        bucket = self.buckets.get(frame)
+        if bucket is None:
+            bucket = self.buckets[frame] = []
+        bucket.append(enemy)
+
+    def due(self, frame):
+        """The live enemies whose turn is `frame`, in spawn order."""
+        bucket = [enemy for enemy in self.buckets.pop(frame, ()) if enemy.alive()]
+        bucket.sort(key=attrgetter("lod_order"))
+        return bucket
+
+    def reschedule(self, enemy, frame, camera_x):
+        """Books the next turn of an enemy that just ran at `frame`."""
+        if not enemy.alive():
+            return
+        half_view = self.view_width / 2
+        steps = 1
+        if abs(enemy.world_x - (camera_x + half_view)) > half_view + self.margin:
+            steps = enemy.far_steps(self.period)
+            if enemy.update_steps == 1:
+                # Just spawned or just left the camera: move onto this enemy's phase
+                steps = min(steps, 1 + (enemy.lod_order - frame - 1) % self.period)
+        self.schedule(enemy, frame + steps, steps)
+
+    def rebuild(self, enemies, spawned):
+        """Rebuilds the buckets from the schedule stored on each enemy."""
+        self.buckets = {}
+        for enemy in enemies:
+            self.schedule(enemy, enemy.next_update, enemy.update_steps)
+        self.spawned = spawned
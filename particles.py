@@ -0,0 +1,155 @@
+import numpy as np
+import pygame
+
+from sprites import display_format
+
+class ParticlePool:
+    """Fixed-capacity ring buffer of explosion particles.
+
+    Positions, velocities and lifetimes live in preallocated arrays, so an
+    explosion writes 15 slots instead of creating 15 sprites and surfaces.
+    When the pool is full the oldest particles are overwritten. Purely
+    simulation state: drawing is done by ParticleRenderer.
+    """
+    def __init__(self, capacity=2048, rng=None):
+        self.capacity = capacity
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.vx = np.zeros(capacity)
+        self.vy = np.zeros(capacity)
+        self.lifespan = np.zeros(capacity) # <= 0 means the slot is free
+        self.initial_lifespan = np.ones(capacity)
+        self.size = np.zeros(capacity, dtype=np.int8)
+        self.color = np.zeros(capacity, dtype=np.int16) # Index into `palette`
+        self.palette = []
+        self._palette_index = {}
+        self.head = 0
+
+        # Stats
+        self.peak = 0
+        self.emitted = 0
+        self.overwritten = 0
+
+    def __len__(self):
+        return int(np.count_nonzero(self.lifespan > 0))
+
+    def color_index(self, color):
+        index = self._palette_index.get(color)
+        if index is None:
+            index = self._palette_index[color] = len(self.palette)
+            self.palette.append(color)
+        return index
+
+    def emit(self, x, y, color, count=15):
+        """Creates a burst of particles at a given location."""
+        count = min(count, self.capacity)
+        slots = (self.head + np.arange(count)) % self.capacity
+        self.head = (self.head + count) % self.capacity
+        self.overwritten += int(np.count_nonzero(self.lifespan[slots] > 0))
+        self.emitted += count
+
+        rng = self.rng
+        self.x[slots] = x
+        self.y[slots] = y
+        self.vx[slots] = rng.uniform(-4, 4, count)
+        self.vy[slots] = rng.uniform(-4, 4, count)
+        life = rng.integers(20, 41, count) # Frames
+        self.lifespan[slots] = life
+        self.initial_lifespan[slots] = life
+        self.size[slots] = rng.integers(2, 6, count)
+        self.color[slots] = self.color_index(color)
+        self.peak = max(self.peak, len(self))
+
+    def update(self):
+        live = self.lifespan > 0
+        if not live.any():
+            return
+        self.x[live] += self.vx[live]
+        self.y[live] += self.vy[live]
+        self.lifespan[live] -= 1
+
+    def live_slots(self):
+        return np.flatnonzero(self.lifespan > 0)
+
+    def alpha(self, slots):
+        """The fade-out alpha (0-255) of the given slots."""
+        return (255 * (self.lifespan[slots] / self.initial_lifespan[slots])).astype(np.int32)
+
+    def stats(self):
+        return {
+            "live": len(self),
+            "capacity": self.capacity,
+            "peak": self.peak,
+            "emitted": self.emitted,
+            "overwritten": self.overwritten,
+        }
+
+class ParticleRenderer:
+    """Draws a ParticlePool with shared, pre-rendered particle images.
+
+    Each (size, color, alpha bucket) combination is rendered once and reused
+    by every particle that needs it; a frame is a single `blits` call. Call
+    `prewarm` with the explosion colors to build every image up front so no
+    surfaces are created mid-game.
+    """
+    def __init__(self, alpha_buckets=16, sizes=range(2, 6)):
+        self.alpha_buckets = alpha_buckets
+        self.sizes = tuple(sizes)
+        self._images = {}
+        self.allocations = 0 # Surfaces created in total
+        self.frame_allocations = 0 # Surfaces created by the last draw
+        self.bounds = None # Rect around everything the last draw touched
+
+    def _image(self, size, color, bucket):
+        key = (size, color, bucket)
+        image = self._images.get(key)
+        if image is None:
+            image = pygame.Surface((size, size))
+            image.fill(color)
+            image.set_alpha(bucket * 255 // (self.alpha_buckets - 1))
+            image = display_format(image)
+            self._images[key] = image
+            self.allocations += 1
+            self.frame_allocations += 1
+        return image
+
+    def prewarm(self, colors):
+        for color in colors:
+            for size in self.sizes:
+                for bucket in range(self.alpha_buckets):
+                    self._image(size, tuple(color), bucket)
+
+    def draw(self, surface, pool, camera_x, alpha=1.0):
+        """Draws the live particles; `alpha` < 1 places them that far along their last move."""
+        self.frame_allocations = 0
+        self.bounds = None
+        slots = pool.live_slots()
+        if not len(slots):
+            return
+        sizes = pool.size[slots].astype(np.int32)
+        xs = pool.x[slots]
+        ys = pool.y[slots]
+        if alpha < 1:
+            xs = xs - pool.vx[slots] * (1 - alpha)
+            ys = ys - pool.vy[slots] * (1 - alpha)
+        # Same rounding as rect.center = (int(x - camera_x), int(y))
+        left = (xs - camera_x).astype(np.int32) - sizes // 2
+        top = ys.astype(np.int32) - sizes // 2
+        width, height = surface.get_size()
+        visible = (left + sizes > 0) & (left < width) & (top + sizes > 0) & (top < height)
+        if not visible.any():
+            return
+        slots = slots[visible]
+        x0 = int(left[visible].min())
+        y0 = int(top[visible].min())
+        self.bounds = pygame.Rect(x0, y0, int((left + sizes)[visible].max()) - x0, int((top + sizes)[visible].max()) - y0)
+        buckets = pool.alpha(slots) * (self.alpha_buckets - 1) // 255
+        palette = pool.palette
+        image = self._image
+        surface.blits(
+            [(image(s, palette[c], b), (x, y)) for s, c, b, x, y in zip(
+                sizes[visible].tolist(), pool.color[slots].tolist(), buckets.tolist(),
+                left[visible].tolist(), top[visible].tolist())],
+            doreturn=False,
+        )
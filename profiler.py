@@ -0,0 +1,139 @@
+import collections
+import csv
+import json
+import time
+import numpy as np
+
+class Profiler:
+    """Frame-time profiler with named scopes and per-frame counters.
+
+    Wrap a phase in `with profiler.scope("name"):`; time spent in a scope is
+    summed over the frame, and `end_frame` files the totals into a rolling
+    window of the last `window` frames so percentiles reflect recent play.
+    Counters (`count`, or `gauge` for levels such as entity counts) are
+    kept per frame the same way.
+    """
+    enabled = True
+
+    def __init__(self, window=600):
+        self.window = window
+        self.frames = 0
+        self.history = collections.OrderedDict() # name -> deque of per-frame totals (ms)
+        self.counters = collections.OrderedDict() # name -> deque of per-frame values
+        self._frame_times = {}
+        self._frame_counts = {}
+
+    def scope(self, name):
+        return _Scope(self, name)
+
+    def add(self, name, seconds):
+        """Adds time measured elsewhere to a scope."""
+        self._frame_times[name] = self._frame_times.get(name, 0.0) + seconds
+
+    def count(self, name, value=1):
+        self._frame_counts[name] = self._frame_counts.get(name, 0) + value
+
+    def gauge(self, name, value):
+        """Records a level (e.g. an entity count); the last value in a frame wins."""
+        self._frame_counts[name] = value
+
+    def end_frame(self):
+        for name, seconds in self._frame_times.items():
+            self._series(self.history, name).append(seconds * 1000)
+        for name, value in self._frame_counts.items():
+            self._series(self.counters, name).append(value)
+        self._frame_times = {}
+        self._frame_counts = {}
+        self.frames += 1
+
+    def _series(self, table, name):
+        series = table.get(name)
+        if series is None:
+            series = table[name] = collections.deque(maxlen=self.window)
+        return series
+
+    def summary(self):
+        """Returns {name: {p50, p95, p99, mean, max, frames}} for every scope and counter."""
+        rows = collections.OrderedDict()
+        for kind, table in (("ms", self.history), ("count", self.counters)):
+            for name, series in table.items():
+                values = np.fromiter(series, dtype=np.float64, count=len(series))
+                p50, p95, p99 = np.percentile(values, (50, 95, 99))
+                rows[name] = {
+                    "unit": kind,
+                    "p50": float(p50), "p95": float(p95), "p99": float(p99),
+                    "mean": float(values.mean()), "max": float(values.max()),
+                    "frames": len(values),
+                }
+        return rows
+
+    def dump(self, path):
+        """Writes the summary as JSON, or CSV when `path` ends in .csv."""
+        rows = self.summary()
+        with open(path, "w", newline="") as f:
+            if path.endswith(".csv"):
+                writer = csv.writer(f)
+                writer.writerow(["name", "unit", "p50", "p95", "p99", "mean", "max", "frames"])
+                for name, row in rows.items():
+                    writer.writerow([name, row["unit"]] + [f"{row[k]:.4f}" for k in ("p50", "p95", "p99", "mean", "max")] + [row["frames"]])
+            else:
+                json.dump({"frames": self.frames, "window": self.window, "stats": rows}, f, indent=2)
+
+    def overlay_lines(self):
+        lines = ["name            p50    p95    p99"]
+        for name, row in self.summary().items():
+            lines.append(f"{name[:15]:<15} {row['p50']:6.2f} {row['p95']:6.2f} {row['p99']:6.2f}")
+        return lines
+
+class _Scope:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.add(self.name, time.perf_counter() - self.start)
+        return False
+
+class NullProfiler:
+    """Drop-in Profiler that records nothing; the default everywhere."""
+    enabled = False
+    frames = 0
+
+    def scope(self, name):
+        return _NULL_SCOPE
+
+    def add(self, name, seconds):
+        pass
+
+    def count(self, name, value=1):
+        pass
+
+    def gauge(self, name, value):
+        pass
+
+    def end_frame(self):
+        pass
+
+    def summary(self):
+        return collections.OrderedDict()
+
+    def overlay_lines(self):
+        return []
+
+class _NullScope:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_SCOPE = _NullScope()
+NULL_PROFILER = NullProfiler()
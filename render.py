@@ -0,0 +1,285 @@
+import time
+from operator import attrgetter
+import numpy as np
+import pygame
+
+from hud import Hud
+from particles import ParticleRenderer
+from profiler import NULL_PROFILER
+from scanner import SCANNER_HEIGHT, Scanner
+from simulation import (
+    SCREEN_WIDTH, SCREEN_HEIGHT, WORLD_WIDTH,
+    WHITE, BLACK, RED, GREEN, YELLOW, ORANGE, GREY,
+    FPS, SPRITES,
+)
+from starfield import Starfield
+from terrain_cache import TerrainCache
+
+HUD_RECT = pygame.Rect(0, SCREEN_HEIGHT - 35, SCREEN_WIDTH, 25)
+WAVE_BAR = pygame.Rect(700, SCREEN_HEIGHT - 14, 80, 3) # Wave progress, under the wave number
+MAX_DIRTY_RECTS = 400 # Past this a full flip is cheaper than a long rect list
+PROFILE_REFRESH = 30 # Frames between redraws of the profiler overlay text
+# Wider than half of any sprite plus one step of movement, so culling never
+# drops a sprite that shows, interpolated or not
+CULL_MARGIN = 64
+
+# --- Renderer ---
+class Renderer:
+    """Draws a World onto a target surface.
+
+    With `dirty_rects` set, `present` pushes only the parts of the screen
+    that can have changed (sprites and particles where they were and where
+    they are, stars, scanner and HUD, and the terrain band when the camera
+    scrolls) via display.update; only a terrain rebuild or a very long rect
+    list falls back to a full flip. Only sprites
+    near the camera window get screen positions and blits. With
+    `game_clock` set, animation follows the World's frame count instead of
+    wall time, so the same game state always draws the same picture.
+    """
+    def __init__(self, screen, world_width=WORLD_WIDTH, star_count=150, star_layers=1, scanner_refresh=1,
+                 dirty_rects=False, profiler=NULL_PROFILER, seed=None, game_clock=False):
+        self.screen = screen
+        self.profiler = profiler
+        self.show_profile = False # On-screen profiler overlay
+        self._profile_surface = None
+        self.world_width = world_width
+        self.game_clock = game_clock
+        self.font = pygame.font.SysFont("Consolas", 18, bold=True)
+        self.hud = Hud(self.font)
+
+        # Sprite images are blitted every frame, so match the display's pixel format
+        if pygame.display.get_surface() is not None:
+            SPRITES.convert()
+
+        # Create starfield
+        self.stars = Starfield(world_width, SCREEN_WIDTH, SCREEN_HEIGHT, star_count, star_layers,
+                               rng=np.random.default_rng(seed))
+
+        self.terrain_cache = None
+        self.scanner = Scanner(SCREEN_WIDTH, world_width, scanner_refresh)
+
+        # Explosion images are shared and built before play starts
+        self.particles = ParticleRenderer()
+        self.particles.prewarm([GREEN, ORANGE])
+
+        # Dirty-rect tracking
+        self.dirty_rects = dirty_rects
+        self._dirty = None # Rects to push for the frame just drawn; None means everything
+        self._regions = [] # What the previous frame drew
+        self._drawn_camera = None
+        self._drawn_rebuilds = None
+
+        # Frame cost
+        self.frames = 0
+        self.full_updates = 0
+        self.rects_pushed = 0
+        self.sprites_culled = 0
+        self.visible = [] # Sprites drawn in the last frame
+        self.draw_seconds = 0.0
+        self.present_seconds = 0.0
+
+    def draw(self, world, alpha=1.0):
+        """Draws one complete frame of the world.
+
+        `alpha` below 1 draws the world that far between the previous step
+        and the latest one (see World.interpolate).
+        """
+        start = time.perf_counter()
+        screen = self.screen
+        camera_x = world.camera_x
+        if alpha < 1:
+            camera_x = self.lerp(world.previous_camera_x, camera_x, alpha, world.width)
+
+        profiler = self.profiler
+        surfaces_before = self.surfaces_created() if profiler.enabled else 0
+
+        screen.fill(BLACK)
+
+        # Draw starfield
+        with profiler.scope("draw.stars"):
+            ticks = world.frame * 1000 // FPS if self.game_clock else None
+            self.stars.draw(screen, camera_x, ticks)
+
+        with profiler.scope("draw.sprites"):
+            visible = self.visible_sprites(world, camera_x)
+            # Update sprite screen positions based on camera
+            previous = world.previous_positions if alpha < 1 else None
+            if previous:
+                lerp = self.lerp
+                width = world.width
+                for sprite in visible:
+                    x = sprite.world_x
+                    y = sprite.world_y
+                    last = previous.get(sprite)
+                    if last is not None:
+                        x = lerp(last[0], x, alpha, width)
+                        y = lerp(last[1], y, alpha, SCREEN_HEIGHT)
+                    sprite.rect.centerx = int(x - camera_x)
+                    sprite.rect.centery = int(y)
+            else:
+                for sprite in visible:
+                    sprite.rect.centerx = int(sprite.world_x - camera_x)
+                    sprite.rect.centery = int(sprite.world_y)
+
+            # Draw the game objects in view
+            screen.blits([(sprite.image, sprite.rect) for sprite in visible], False)
+        with profiler.scope("draw.particles"):
+            self.particles.draw(screen, world.particles, camera_x, alpha)
+        with profiler.scope("draw.terrain"):
+            self.draw_terrain(world, camera_x)
+        with profiler.scope("draw.scanner"):
+            self.draw_scanner(world)
+
+        # Draw UI
+        with profiler.scope("draw.hud"):
+            player = world.player
+            hud = self.hud
+            hud.draw_field(screen, "SCORE: ", f"{world.score:06d}", 10, SCREEN_HEIGHT - 35, WHITE)
+            self.draw_text(f"LIVES: {player.lives}", 200, SCREEN_HEIGHT - 35)
+            self.draw_text(f"BOMBS: {player.bombs}", 320, SCREEN_HEIGHT - 35)
+            self.draw_text(f"HUMANS: {len(world.humanoids)}", 450, SCREEN_HEIGHT - 35)
+
+            # Draw altitude indicator
+            altitude = int((world.terrain.height_at(player.world_x) - player.world_y) / 2)
+            hud.draw_field(screen, "ALT: ", f"{altitude:03d}", 600, SCREEN_HEIGHT - 35, WHITE)
+            if world.waves is not None:
+                self.draw_wave(world)
+            if self.show_profile:
+                self.draw_profile()
+        if profiler.enabled:
+            profiler.count("surfaces", self.surfaces_created() - surfaces_before)
+
+        if self.dirty_rects:
+            self._dirty = self.collect_dirty(world, int(camera_x))
+        self.draw_seconds += time.perf_counter() - start
+
+    def visible_sprites(self, world, camera_x):
+        """The sprites that can overlap the screen, in drawing order.
+
+        Entity-store sprites are picked by one vector test on each table's x
+        column, so only the ones in view cost Python work; other sprites have
+        their world x read one by one. The rest keep stale rects and are
+        neither moved nor blitted. The camera is clamped inside the world, so
+        the window never straddles the wrap seam.
+        """
+        low = camera_x - CULL_MARGIN
+        high = camera_x + SCREEN_WIDTH + CULL_MARGIN
+        store = world.store
+        if store is None:
+            visible = [sprite for sprite in world.all_sprites if low < sprite.world_x < high]
+        else:
+            # The player and the humanoids are the only sprites kept outside the store
+            visible = [sprite for sprite in world.humanoids if low < sprite.world_x < high]
+            if low < world.player.world_x < high:
+                visible.append(world.player)
+            for table in (store.landers, store.mutants, store.lasers):
+                xs = table.view("x")
+                owners = table.owners
+                visible.extend(owners[i] for i in np.flatnonzero((xs > low) & (xs < high)).tolist())
+            visible.sort(key=attrgetter("draw_order"))
+        self.visible = visible
+        self.sprites_culled += len(world.all_sprites) - len(visible)
+        return visible
+
+    def collect_dirty(self, world, camera):
+        """Returns the screen rects that differ from the previous frame, or None for all of them."""
+        screen_rect = self.screen.get_rect()
+        regions = [HUD_RECT, pygame.Rect(0, 0, SCREEN_WIDTH, SCANNER_HEIGHT)]
+        regions.extend(s.rect.clip(screen_rect) for s in self.visible if s.rect.colliderect(screen_rect))
+        if self.particles.bounds is not None:
+            regions.append(self.particles.bounds.clip(screen_rect))
+        if self.show_profile and self._profile_surface is not None:
+            regions.append(self._profile_surface.get_rect(topleft=(10, 60)))
+        xs, ys = self.stars.drawn
+        regions.extend(pygame.Rect(x - 1, y - 1, 2, 2) for x, y in zip(xs.tolist(), ys.tolist()))
+
+        terrain = self.terrain_cache
+        rebuilt = terrain.rebuilds != self._drawn_rebuilds
+        scrolled = camera != self._drawn_camera
+        previous = self._regions
+        self._regions = regions
+        self._drawn_camera = camera
+        self._drawn_rebuilds = terrain.rebuilds
+        if rebuilt or len(regions) + len(previous) > MAX_DIRTY_RECTS:
+            return None
+        if scrolled:
+            # Sprites and stars are covered where they were and where they are;
+            # the ground line moved across the whole width of its band
+            band = pygame.Rect(0, terrain.band_top, SCREEN_WIDTH, terrain.band_bottom - terrain.band_top)
+            return regions + previous + [band.clip(screen_rect)]
+        return regions + previous
+
+    def present(self):
+        """Shows the frame drawn by `draw`."""
+        start = time.perf_counter()
+        if self.dirty_rects and self._dirty is not None:
+            pygame.display.update(self._dirty)
+            self.rects_pushed += len(self._dirty)
+        else:
+            pygame.display.flip()
+            self.full_updates += 1
+        self.frames += 1
+        elapsed = time.perf_counter() - start
+        self.present_seconds += elapsed
+        self.profiler.add("present", elapsed)
+
+    def surfaces_created(self):
+        """Surfaces the renderer and its caches have created so far."""
+        return (self.particles.allocations + self.hud.text.renders + SPRITES.builds
+                + (self.terrain_cache.rebuilds if self.terrain_cache is not None else 0))
+
+    def draw_profile(self):
+        """Draws the profiler's percentile table, re-rendered every PROFILE_REFRESH frames."""
+        if self._profile_surface is None or self.profiler.frames % PROFILE_REFRESH == 0:
+            lines = self.profiler.overlay_lines()
+            line_height = self.font.get_linesize()
+            width = max([self.font.size(line)[0] for line in lines] or [0])
+            surface = pygame.Surface((width + 8, line_height * len(lines) + 8), pygame.SRCALPHA)
+            surface.fill((0, 0, 0, 180))
+            for i, line in enumerate(lines):
+                surface.blit(self.font.render(line, True, YELLOW), (4, 4 + i * line_height))
+            self._profile_surface = surface
+        self.screen.blit(self._profile_surface, (10, 60))
+
+    def frame_cost(self):
+        frames = max(self.frames, 1)
+        return {
+            "mode": "dirty rects" if self.dirty_rects else "full flip",
+            "frames": self.frames,
+            "draw_ms": self.draw_seconds * 1000 / frames,
+            "present_ms": self.present_seconds * 1000 / frames,
+            "full_updates": self.full_updates,
+            "rects_per_frame": self.rects_pushed / frames,
+            "culled_per_frame": self.sprites_culled / frames,
+        }
+
+    def draw_wave(self, world):
+        """The wave number and a bar for how much of the wave is dealt with."""
+        waves = world.waves
+        self.hud.draw_field(self.screen, "WAVE ", str(waves.number), WAVE_BAR.x, SCREEN_HEIGHT - 35, WHITE)
+        self.screen.fill(GREY, WAVE_BAR)
+        done = WAVE_BAR.copy()
+        done.width = int(WAVE_BAR.width * waves.progress(world))
+        self.screen.fill(GREEN, done)
+
+    def draw_game_over(self):
+        self.draw_text("GAME OVER - Press ESC to quit", SCREEN_WIDTH//2 - 150, SCREEN_HEIGHT//2, RED)
+
+    def draw_terrain(self, world, camera_x=None):
+        # The ground is rasterized once per world and scrolled into view
+        if self.terrain_cache is None or self.terrain_cache.terrain is not world.terrain:
+            self.terrain_cache = TerrainCache(world.terrain, world.width, GREEN)
+        self.terrain_cache.draw(self.screen, world.camera_x if camera_x is None else camera_x)
+
+    def draw_scanner(self, world):
+        self.scanner.draw(self.screen, world)
+
+    @staticmethod
+    def lerp(a, b, alpha, span):
+        # A jump of more than half the world is a wrap or a respawn, not movement
+        if abs(b - a) > span / 2:
+            return b
+        return a + (b - a) * alpha
+
+    def draw_text(self, text, x, y, color=WHITE):
+        self.hud.draw_text(self.screen, text, x, y, color)
@@ -0,0 +1,335 @@
+"""Parallel rollouts: VectorDefenderEnvs spread over worker processes.
+
+    runner = RolloutRunner(num_workers=4, envs_per_worker=256, seed=0)
+    obs = runner.reset()
+    obs, rewards, terminated, truncated, infos = runner.step(actions)
+    runner.close()
+
+    python rollout.py --workers 1 2 4 8   # steps/sec as workers are added
+
+Every worker owns a contiguous block of rows. Observations, rewards, done
+flags and actions live in one `multiprocessing.shared_memory` block; workers
+write their rows in place and the arrays the runner returns are views of it,
+so the learner reads them without a copy (and they change on the next
+step). Workers get their own seeds from one SeedSequence. A worker that
+dies or stops answering is replaced by a fresh one with a new seed; its
+episodes are cut short and reported as truncated. With
+observation="pixels" the workers run capture.PixelDefenderEnv instead and
+the observations are stacked grayscale frames of the rendered game.
+"""
+import argparse
+import multiprocessing
+import time
+from multiprocessing import connection, shared_memory
+import numpy as np
+
+from capture import PIXEL_SHAPE, PixelDefenderEnv
+from vector_env import NUM_ACTIONS, OBSERVATION_SHAPES, VectorDefenderEnv
+
+STEP_TIMEOUT = 60 # Seconds a worker may take over one step before it is restarted
+START_TIMEOUT = 60 # Seconds a new worker may take to build its games and report ready
+RESTART_ATTEMPTS = 3 # Replacements tried for a failed worker before the runner gives up
+
+# Observation kinds: (shape, dtype) of one game's observation
+OBSERVATIONS = {name: (shape, np.float32) for name, shape in OBSERVATION_SHAPES.items()}
+OBSERVATIONS["pixels"] = (PIXEL_SHAPE, np.uint8) # Rendered frames, see capture.PixelDefenderEnv
+
+# --- Shared Buffers ---
+def layout(num_envs, observation):
+    """(name, shape, dtype, offset) of every shared array, and the total size in bytes."""
+    shape, dtype = OBSERVATIONS[observation]
+    specs = [
+        ("observations", (num_envs,) + tuple(shape), dtype),
+        ("rewards", (num_envs,), np.float32),
+        ("terminated", (num_envs,), np.bool_),
+        ("truncated", (num_envs,), np.bool_),
+        ("actions", (num_envs,), np.int64),
+    ]
+    arrays = []
+    offset = 0
+    for name, shape, dtype in specs:
+        arrays.append((name, shape, dtype, offset))
+        size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        offset += (size + 63) // 64 * 64 # Keep every array cache-line aligned
+    return arrays, offset
+
+def views(shm, arrays):
+    return {name: np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+            for name, shape, dtype, offset in arrays}
+
+# --- Worker ---
+def worker_main(conn, shm_name, arrays, start, stop, seed, observation, max_steps, world_options):
+    """Runs one VectorDefenderEnv over rows [start, stop) of the shared arrays."""
+    shm = shared_memory.SharedMemory(name=shm_name) # Owned (and unlinked) by the runner
+    shared = {name: array[start:stop] for name, array in views(shm, arrays).items()}
+    if observation == "pixels":
+        env = PixelDefenderEnv(stop - start, seed=seed, max_steps=max_steps,
+                               observations=shared["observations"], **world_options)
+    else:
+        env = VectorDefenderEnv(stop - start, seed=seed, max_steps=max_steps, observation=observation,
+                                observations=shared["observations"], **world_options)
+    env.reset()
+    conn.send(("ready", None))
+    try:
+        serve(conn, env, shared, start)
+    except (EOFError, KeyboardInterrupt):
+        pass # The runner went away
+    del shared, env # Views must go before the mapping can close
+    shm.close()
+
+def serve(conn, env, shared, start):
+    while True:
+        command = conn.recv()
+        if command == "close":
+            return
+        if command == "step":
+            _, rewards, terminated, truncated, infos = env.step(shared["actions"])
+            shared["rewards"][:] = rewards
+            shared["terminated"][:] = terminated
+            shared["truncated"][:] = truncated
+            finished = None
+            if "finished" in infos:
+                finished = (infos["finished"] + start, infos["episode_return"], infos["episode_length"])
+            conn.send(("step", finished))
+        elif command == "reset":
+            env.reset()
+            conn.send(("reset", None))
+
+class Worker:
+    """The runner's handle on one worker process and the rows it owns."""
+    def __init__(self, index, start, stop, seeds):
+        self.index = index
+        self.start = start
+        self.stop = stop
+        self.seeds = seeds # SeedSequence; every (re)start spawns a new child from it
+        self.process = None
+        self.conn = None
+        self.seed = None
+
+# --- Runner ---
+class RolloutRunner:
+    """Steps `num_workers` x `envs_per_worker` games in lock-step across processes."""
+    def __init__(self, num_workers, envs_per_worker, seed=None, observation="features", max_steps=None,
+                 step_timeout=STEP_TIMEOUT, start_timeout=START_TIMEOUT, context=None, **world_options):
+        self.num_workers = num_workers
+        self.envs_per_worker = envs_per_worker
+        self.num_envs = num_workers * envs_per_worker
+        self.observation = observation
+        self.max_steps = max_steps
+        self.step_timeout = step_timeout
+        self.start_timeout = start_timeout
+        self.world_options = world_options
+        self.num_actions = NUM_ACTIONS
+        # Spawned workers start clean instead of inheriting the learner's pygame/display state
+        self.context = multiprocessing.get_context(context or "spawn")
+
+        self.arrays, size = layout(self.num_envs, observation)
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+        shared = views(self.shm, self.arrays)
+        self.observations = shared["observations"]
+        self.rewards = shared["rewards"]
+        self.terminated = shared["terminated"]
+        self.truncated = shared["truncated"]
+        self.actions = shared["actions"]
+        self.actions[:] = 0
+
+        # Stats
+        self.steps = 0 # Environment steps, summed over all games
+        self.seconds = 0.0
+        self.restarts = 0
+
+        seeds = np.random.SeedSequence(seed).spawn(num_workers)
+        self.workers = [Worker(i, i * envs_per_worker, (i + 1) * envs_per_worker, seeds[i])
+                        for i in range(num_workers)]
+        try:
+            for worker in self.workers:
+                self.start_worker(worker)
+            self.wait_ready(self.workers)
+        except BaseException:
+            # Don't leave workers or the shared block behind
+            for worker in self.workers:
+                if worker.process is not None:
+                    self.stop_worker(worker)
+            self.close()
+            raise
+
+    def start_worker(self, worker):
+        worker.seed = int(worker.seeds.spawn(1)[0].generate_state(1)[0])
+        parent, child = self.context.Pipe()
+        process = self.context.Process(
+            target=worker_main, daemon=True,
+            args=(child, self.shm.name, self.arrays, worker.start, worker.stop, worker.seed,
+                  self.observation, self.max_steps, self.world_options),
+        )
+        try:
+            process.start()
+        except BaseException:
+            parent.close()
+            raise
+        finally:
+            child.close()
+        worker.conn = parent
+        worker.process = process
+
+    def wait_ready(self, workers):
+        """Waits up to `start_timeout` in all for `workers` to report ready."""
+        deadline = time.perf_counter() + self.start_timeout
+        for worker in workers:
+            if not worker.conn.poll(max(deadline - time.perf_counter(), 0)):
+                raise RuntimeError(f"rollout worker {worker.index} did not start within {self.start_timeout} s")
+            try:
+                worker.conn.recv()
+            except EOFError:
+                raise RuntimeError(f"rollout worker {worker.index} failed to start") from None
+
+    def stop_worker(self, worker):
+        if worker.process.is_alive():
+            worker.process.kill() # A stuck (or stopped) worker may never act on SIGTERM
+        worker.process.join()
+        worker.conn.close()
+
+    def restart(self, worker):
+        """Replaces a dead or stuck worker; its games start over and count as truncated.
+
+        A replacement that fails to start is replaced in turn, up to
+        RESTART_ATTEMPTS times; then RuntimeError is raised.
+        """
+        self.stop_worker(worker)
+        for attempt in range(RESTART_ATTEMPTS):
+            self.restarts += 1
+            self.start_worker(worker)
+            try:
+                self.wait_ready([worker])
+                break
+            except RuntimeError:
+                self.stop_worker(worker)
+        else:
+            raise RuntimeError(f"rollout worker {worker.index} failed to restart {RESTART_ATTEMPTS} times")
+        rows = slice(worker.start, worker.stop)
+        self.rewards[rows] = 0
+        self.terminated[rows] = False
+        self.truncated[rows] = True
+
+    def _command(self, command):
+        """Sends `command` to every worker and collects the replies, restarting any that fail."""
+        for worker in self.workers:
+            try:
+                worker.conn.send(command)
+            except (BrokenPipeError, OSError):
+                pass # Noticed below
+        pending = {worker.conn: worker for worker in self.workers}
+        sentinels = {worker.process.sentinel: worker for worker in self.workers}
+        replies = {}
+        deadline = time.perf_counter() + self.step_timeout
+        while pending:
+            ready = connection.wait(list(pending) + list(sentinels), max(deadline - time.perf_counter(), 0))
+            if not ready:
+                break # Whoever is left is stuck
+            for handle in ready:
+                if handle in pending:
+                    worker = pending[handle]
+                    try:
+                        replies[worker.index] = worker.conn.recv()[1]
+                    except (EOFError, OSError):
+                        continue # Died; its sentinel reports it
+                    del pending[handle]
+                    del sentinels[worker.process.sentinel]
+                elif handle in sentinels:
+                    worker = sentinels.pop(handle)
+                    del pending[worker.conn]
+                    self.restart(worker)
+        for worker in pending.values():
+            self.restart(worker)
+        return replies
+
+    def reset(self):
+        self._command("reset")
+        self.rewards[:] = 0
+        self.terminated[:] = False
+        self.truncated[:] = False
+        return self.observations
+
+    def step(self, actions):
+        """Steps every game. Returns shared (observations, rewards, terminated, truncated) views and infos.
+
+        infos["finished"], ["episode_return"] and ["episode_length"] list the
+        episodes that ended; infos["restarted"] the workers that were replaced.
+        """
+        start = time.perf_counter()
+        self.actions[:] = actions
+        restarts = self.restarts
+        replies = self._command("step")
+        self.seconds += time.perf_counter() - start
+        self.steps += self.num_envs
+
+        finished = [reply for reply in replies.values() if reply is not None]
+        infos = {"restarted": self.restarts - restarts}
+        if finished:
+            infos["finished"] = np.concatenate([f[0] for f in finished])
+            infos["episode_return"] = np.concatenate([f[1] for f in finished])
+            infos["episode_length"] = np.concatenate([f[2] for f in finished])
+        return self.observations, self.rewards, self.terminated, self.truncated, infos
+
+    def stats(self):
+        return {
+            "workers": self.num_workers,
+            "envs": self.num_envs,
+            "steps": self.steps,
+            "seconds": self.seconds,
+            "steps_per_second": self.steps / self.seconds if self.seconds else 0.0,
+            "restarts": self.restarts,
+        }
+
+    def close(self):
+        started = [worker for worker in self.workers if worker.process is not None]
+        for worker in started:
+            try:
+                worker.conn.send("close")
+            except (BrokenPipeError, OSError):
+                pass
+        for worker in started:
+            worker.process.join(timeout=5)
+            if worker.process.is_alive():
+                worker.process.kill()
+                worker.process.join()
+            worker.conn.close()
+        self.observations = self.rewards = self.terminated = self.truncated = self.actions = None
+        try:
+            self.shm.close()
+        except BufferError:
+            pass # The caller still holds views; the mapping goes with them
+        self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+# --- Scaling Report ---
+def main():
+    parser = argparse.ArgumentParser(description="Measure rollout throughput as workers are added")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--envs-per-worker", type=int, default=256)
+    parser.add_argument("--steps", type=int, default=300)
+    parser.add_argument("--observation", choices=sorted(OBSERVATIONS), default="features")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{multiprocessing.cpu_count()} CPUs, {args.envs_per_worker} games per worker, {args.observation} observations")
+    base = None
+    for num_workers in args.workers:
+        with RolloutRunner(num_workers, args.envs_per_worker, seed=args.seed, observation=args.observation) as runner:
+            rng = np.random.default_rng(args.seed)
+            runner.reset()
+            for _ in range(args.steps):
+                runner.step(rng.integers(0, NUM_ACTIONS, runner.num_envs))
+            stats = runner.stats()
+        rate = stats["steps_per_second"]
+        base = base or rate
+        print(f"{num_workers:3d} workers  {stats['envs']:6d} games  {rate:12,.0f} steps/s  "
+              f"x{rate / base:4.2f}  {stats['restarts']} restarts")
+
+if __name__ == "__main__":
+    main()
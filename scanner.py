@@ -0,0 +1,138 @@
+import numpy as np
+import pygame
+
+from simulation import (
+    PLAYABLE_HEIGHT,
+    WHITE, BLACK, RED, GREEN, YELLOW, CYAN, ORANGE, PURPLE,
+    Lander, Mutant,
+)
+from sprites import display_format
+
+# Scanner drawing constants
+SCANNER_HEIGHT = 50
+SCANNER_TOP_Y = 10
+SCANNER_BOTTOM_Y = 45
+SCANNER_DISPLAY_HEIGHT = SCANNER_BOTTOM_Y - SCANNER_TOP_Y
+
+# Blip kinds, indexing BLIP_STYLES
+ENEMY, CARRIER, MUTANT, HUMANOID, FALLING, CARRIED = range(6)
+BLIP_STYLES = [(RED, 2), (PURPLE, 2), (ORANGE, 2), (WHITE, 1), (YELLOW, 1), (CYAN, 1)]
+
+class Scanner:
+    """The minimap strip along the top of the screen.
+
+    The background, border and grid never change, so they are drawn once.
+    Blip positions for every enemy and humanoid are scaled in one vectorized
+    pass and stamped with pre-rendered dot images in a single `blits` call;
+    stacked blips are stamped once. With `refresh_every` > 1 the blips are
+    only recomputed every that many frames and the cached strip is reused in
+    between. The player marker and view window are drawn every frame.
+    """
+    def __init__(self, width, world_width, refresh_every=1):
+        self.width = width
+        self.world_width = world_width
+        self.refresh_every = refresh_every
+        self.scale = width / world_width
+
+        self.background = pygame.Surface((width, SCANNER_HEIGHT))
+        self.background.fill(BLACK)
+        pygame.draw.rect(self.background, GREEN, (0, 0, width, SCANNER_HEIGHT), 2)
+        for i in range(0, width, 100):
+            pygame.draw.line(self.background, (0, 100, 0), (i, 0), (i, SCANNER_HEIGHT))
+        self.background = display_format(self.background)
+
+        self.dots = []
+        for color, radius in BLIP_STYLES:
+            dot = pygame.Surface((2 * radius + 1, 2 * radius + 1))
+            dot.fill(BLACK)
+            pygame.draw.circle(dot, color, (radius, radius), radius)
+            dot = display_format(dot)
+            dot.set_colorkey(BLACK)
+            self.dots.append(dot)
+        self.radii = np.array([radius for color, radius in BLIP_STYLES])
+
+        self.surface = self.background.copy()
+        self.refreshed_frame = None
+        self.refreshes = 0
+
+    def scan_y(self, world_ys):
+        """Maps altitudes onto the scanner's vertical range."""
+        ys = SCANNER_TOP_Y + (((world_ys - 60) / PLAYABLE_HEIGHT) * SCANNER_DISPLAY_HEIGHT).astype(np.int64)
+        return np.clip(ys, SCANNER_TOP_Y, SCANNER_BOTTOM_Y) # Clamp to scanner area
+
+    def enemy_blips(self, world):
+        """Returns (world_xs, world_ys, kinds) of every enemy."""
+        store = world.store
+        if store is not None:
+            landers = store.landers
+            mutants = store.mutants
+            xs = np.concatenate([landers.view("x"), mutants.view("x")])
+            ys = np.concatenate([landers.view("y"), mutants.view("y")])
+            kinds = np.concatenate([
+                np.where(landers.view("has_humanoid"), CARRIER, ENEMY),
+                np.full(mutants.count, MUTANT),
+            ])
+            return xs, ys, kinds
+        enemies = world.enemies.sprites()
+        n = len(enemies)
+        xs = np.fromiter((e.world_x for e in enemies), dtype=np.float64, count=n)
+        ys = np.fromiter((e.world_y for e in enemies), dtype=np.float64, count=n)
+        kinds = np.fromiter((
+            CARRIER if isinstance(e, Lander) and e.has_humanoid else MUTANT if isinstance(e, Mutant) else ENEMY
+            for e in enemies), dtype=np.int64, count=n)
+        return xs, ys, kinds
+
+    def humanoid_blips(self, world):
+        """Returns (world_xs, kinds) of every humanoid."""
+        humanoids = world.humanoids.sprites()
+        n = len(humanoids)
+        xs = np.fromiter((h.world_x for h in humanoids), dtype=np.float64, count=n)
+        kinds = np.fromiter((
+            CARRIED if h.is_carried else FALLING if h.is_falling else HUMANOID
+            for h in humanoids), dtype=np.int64, count=n)
+        return xs, kinds
+
+    def refresh(self, world):
+        """Redraws the cached strip with the current blips."""
+        enemy_xs, enemy_ys, enemy_kinds = self.enemy_blips(world)
+        humanoid_xs, humanoid_kinds = self.humanoid_blips(world)
+        xs = (np.concatenate([enemy_xs, humanoid_xs]) * self.scale).astype(np.int64)
+        ys = np.concatenate([self.scan_y(enemy_ys), np.full(len(humanoid_xs), SCANNER_BOTTOM_Y)]) # Humanoids fixed at bottom
+        kinds = np.concatenate([enemy_kinds, humanoid_kinds])
+
+        # Identical blips at the same spot only need stamping once; keeping
+        # the last of each preserves what ends up on top
+        key = (kinds * SCANNER_HEIGHT + ys) * (self.width + 8) + xs + 4
+        _, last = np.unique(key[::-1], return_index=True)
+        keep = np.sort(len(key) - 1 - last)
+        radii = self.radii[kinds[keep]]
+
+        self.surface.blit(self.background, (0, 0))
+        dots = self.dots
+        self.surface.blits(
+            [(dots[k], (x, y)) for k, x, y in zip(
+                kinds[keep].tolist(), (xs[keep] - radii).tolist(), (ys[keep] - radii).tolist())],
+            doreturn=False,
+        )
+        self.refreshed_frame = world.frame
+        self.refreshes += 1
+
+    def draw(self, surface, world):
+        if self.refreshed_frame is None or world.frame - self.refreshed_frame >= self.refresh_every \
+                or world.frame < self.refreshed_frame:
+            self.refresh(world)
+        surface.blit(self.surface, (0, 0))
+
+        # Player (larger yellow dot with direction indicator)
+        player = world.player
+        player_scan_x = int(player.world_x * self.scale)
+        player_scan_y = int(self.scan_y(np.float64(player.world_y)))
+        pygame.draw.circle(surface, YELLOW, (player_scan_x, player_scan_y), 3)
+        # Direction indicator
+        direction = 5 if player.facing_right else -5
+        pygame.draw.line(surface, YELLOW, (player_scan_x, player_scan_y), (player_scan_x + direction, player_scan_y), 2)
+
+        # View window indicator
+        view_start = int(world.camera_x * self.scale)
+        view_width = int(self.width * self.scale)
+        pygame.draw.rect(surface, WHITE, (view_start, 23, view_width, 5), 1)
@@ -0,0 +1,917 @@
+import pygame
+import random
+import math
+import time
+import numpy as np
+
+from collision import SweepIndex, box_arrays
+from entity_store import ArrayBacked, Column, EntityStore
+from lod import AIScheduler
+from particles import ParticlePool
+from profiler import NULL_PROFILER
+from sprites import SpriteAtlas
+from targeting import TargetingService
+from terrain import Terrain
+from waves import WaveDirector
+
+# --- Screen and World Variables ---
+SCREEN_WIDTH = 800
+SCREEN_HEIGHT = 600
+
+# The game world is wider than the screen to allow for scrolling
+WORLD_WIDTH = SCREEN_WIDTH * 4
+GROUND_LEVEL = SCREEN_HEIGHT - 60
+PLAYABLE_HEIGHT = GROUND_LEVEL - 60 # Height from scanner to ground
+FALL_DAMAGE_DISTANCE = PLAYABLE_HEIGHT * 0.2 # 20% of playable height
+CATCH_DISTANCE = 25 # How close the player must be to catch a falling humanoid
+GRAB_DISTANCE = 15 # How close a Lander must get to abduct its target
+
+FPS = 60
+
+# --- Colors ---
+WHITE = (255, 255, 255)
+BLACK = (0, 0, 0)
+RED = (255, 0, 0)
+GREEN = (0, 255, 0)
+BLUE = (0, 0, 255)
+YELLOW = (255, 255, 0)
+CYAN = (0, 255, 255)
+ORANGE = (255, 165, 0)
+PURPLE = (128, 0, 128)
+GREY = (192, 192, 192)
+LIGHT_GREY = (160, 160, 160)
+
+# --- Sound Events ---
+# The simulation never touches the mixer; it records what happened and the
+# front-end decides what to play.
+SOUND_LASER = "laser"
+SOUND_EXPLOSION = "explosion"
+SOUND_RESCUE = "rescue"
+SOUND_HUMANOID_DEATH = "humanoid_death"
+
+# --- Input ---
+class Inputs:
+    """The controls held or pressed during one frame."""
+    def __init__(self, left=False, right=False, up=False, down=False, fire=False, bomb=False):
+        self.left = left
+        self.right = right
+        self.up = up
+        self.down = down
+        self.fire = fire # Edge-triggered: shoot once this frame
+        self.bomb = bomb # Edge-triggered: detonate a smart bomb this frame
+
+# --- Sprite Images ---
+# Each image is drawn once and shared by every sprite of its kind.
+SPRITES = SpriteAtlas()
+
+def draw_player(atlas):
+    # Longer, more triangular ship sprite
+    image = pygame.Surface((29, 11), pygame.SRCALPHA)
+    # Main body (green)
+    pygame.draw.rect(image, (190, 197, 208), (5, 0, 4, 7))
+    pygame.draw.rect(image, (190, 197, 208), (4, 1, 1, 6))
+    pygame.draw.rect(image, (176, 243, 43), (0, 2, 3, 6))
+    pygame.draw.rect(image, (190, 197, 208), (9, 2, 3, 5))
+    pygame.draw.rect(image, (190, 197, 208), (12, 3, 3, 8))
+    pygame.draw.rect(image, (245, 5, 5), (3, 4, 1, 2))
+    pygame.draw.rect(image, (190, 197, 208), (15, 5, 5, 4))
+    pygame.draw.rect(image, (184, 24, 89), (20, 5, 4, 2))
+    pygame.draw.rect(image, (184, 24, 89), (6, 7, 4, 4))
+    pygame.draw.rect(image, (190, 197, 208), (10, 7, 2, 4))
+    pygame.draw.rect(image, (190, 197, 208), (20, 7, 7, 2))
+    pygame.draw.rect(image, (0, 255, 85), (27, 7, 2, 2))
+    pygame.draw.rect(image, (190, 197, 208), (15, 9, 3, 2))
+    pygame.draw.rect(image, (0, 255, 85), (18, 9, 2, 2))
+    return image
+
+def draw_laser(atlas):
+    image = pygame.Surface((15, 3))
+    image.fill(CYAN)
+    return image
+
+def draw_lander(atlas):
+    # Authentic pixel-art style Lander
+    image = pygame.Surface((17, 17), pygame.SRCALPHA)
+    # Main body (green)
+    pygame.draw.rect(image, (4, 252, 0), (4, 0, 2, 10))
+    pygame.draw.rect(image, (0, 0, 255), (6, 0, 4, 2))
+    pygame.draw.rect(image, (4, 252, 0), (10, 0, 2, 10))
+    pygame.draw.rect(image, (4, 252, 0), (3, 2, 1, 6))
+    pygame.draw.rect(image, (4, 252, 0), (6, 2, 4, 1))
+    pygame.draw.rect(image, (4, 252, 0), (12, 2, 1, 6))
+    pygame.draw.rect(image, (0, 0, 255), (6, 3, 1, 2))
+    pygame.draw.rect(image, (4, 252, 0), (7, 3, 2, 14))
+    pygame.draw.rect(image, (0, 0, 255), (9, 3, 1, 2))
+    pygame.draw.rect(image, (4, 252, 0), (2, 5, 1, 3))
+    pygame.draw.rect(image, (4, 252, 0), (6, 5, 1, 5))
+    pygame.draw.rect(image, (4, 252, 0), (9, 5, 1, 5))
+    pygame.draw.rect(image, (4, 252, 0), (13, 5, 1, 3))
+    pygame.draw.rect(image, (4, 252, 0), (4, 10, 1, 2))
+    pygame.draw.rect(image, (4, 252, 0), (11, 10, 1, 2))
+    pygame.draw.rect(image, (4, 252, 0), (3, 11, 1, 2))
+    pygame.draw.rect(image, (4, 252, 0), (12, 11, 1, 2))
+    pygame.draw.rect(image, (4, 252, 0), (2, 12, 1, 2))
+    pygame.draw.rect(image, (4, 252, 0), (13, 12, 1, 2))
+    pygame.draw.rect(image, (4, 252, 0), (1, 13, 1, 2))
+    pygame.draw.rect(image, (4, 252, 0), (14, 13, 1, 2))
+    pygame.draw.rect(image, (4, 252, 0), (0, 14, 1, 3))
+    pygame.draw.rect(image, (4, 252, 0), (15, 14, 1, 1))
+    pygame.draw.rect(image, (4, 252, 0), (16, 15, 1, 2))
+    return image
+
+def draw_mutant(atlas):
+    # Authentic pixel-art style Mutant
+    image = pygame.Surface((1, 8), pygame.SRCALPHA)
+    pygame.draw.rect(image, ORANGE, (0, 2, 16, 4))
+    pygame.draw.rect(image, ORANGE, (2, 0, 12, 8))
+    pygame.draw.rect(image, RED, (6, 2, 4, 4))
+    return image
+
+def draw_humanoid(atlas):
+    # Authentic pixel-art style Humanoid
+    image = pygame.Surface((8, 14), pygame.SRCALPHA)
+    # Body
+    pygame.draw.rect(image, WHITE, (2, 0, 4, 12))
+    # Arms
+    pygame.draw.rect(image, WHITE, (0, 2, 8, 2))
+    # Legs
+    pygame.draw.rect(image, WHITE, (2, 12, 2, 2))
+    pygame.draw.rect(image, WHITE, (4, 12, 2, 2))
+    return image
+
+SPRITES.register("player", draw_player)
+SPRITES.register("player_left", SPRITES.flipped("player")) # For left movement
+SPRITES.register("player_hidden", SPRITES.filled("player", (0, 0, 0, 0))) # Off phase of the invincibility blink
+SPRITES.register("laser", draw_laser)
+SPRITES.register("lander", draw_lander)
+SPRITES.register("mutant", draw_mutant)
+SPRITES.register("humanoid", draw_humanoid)
+SPRITES.register("humanoid_dead", SPRITES.filled("humanoid", RED)) # Died from a long fall
+
+class SharedImage:
+    """Mixin: `image` is the atlas entry named by `image_key`."""
+    image_key = None
+
+    @property
+    def image(self):
+        return SPRITES[self.image_key]
+
+# --- Game Classes ---
+class Player(SharedImage, pygame.sprite.Sprite):
+    # Render state (facing right, visible) -> atlas image
+    IMAGES = {
+        (True, True): "player",
+        (False, True): "player_left",
+        (True, False): "player_hidden",
+        (False, False): "player_hidden",
+    }
+
+    def __init__(self, world):
+        super().__init__()
+        self.world = world
+        self.rect = SPRITES["player"].get_rect()
+        self.world_x = world.width / 2
+        self.world_y = SCREEN_HEIGHT / 2
+        self.velocity_x = 0
+        self.velocity_y = 0
+        self.lives = 3
+        self.bombs = 3
+        self.facing_right = True
+        self.carried_humanoid = None # Humanoid being carried
+        self.invincible = False
+        self.invincible_timer = 0
+        self.visible = True # Blink phase while invincible
+
+    @property
+    def image_key(self):
+        return self.IMAGES[self.facing_right, self.visible]
+
+    def update(self):
+        # Handle invincibility
+        if self.invincible:
+            self.invincible_timer -= 1
+            # Blinking effect - slowed down
+            self.visible = self.invincible_timer % 20 >= 10
+            if self.invincible_timer <= 0:
+                self.invincible = False
+                self.visible = True
+
+        inputs = self.world.inputs
+
+        # Momentum-based movement (more like original)
+        acceleration = 0.8
+        max_speed = 8
+        friction = 0.97 # CHANGE: Increased friction for more glide
+
+        if inputs.left:
+            self.velocity_x -= acceleration
+            self.facing_right = False
+        if inputs.right:
+            self.velocity_x += acceleration
+            self.facing_right = True
+        if inputs.up:
+            self.velocity_y -= acceleration
+        if inputs.down:
+            self.velocity_y += acceleration
+
+        # Apply friction
+        self.velocity_x *= friction
+        self.velocity_y *= friction
+
+        # Limit max speed
+        self.velocity_x = max(-max_speed, min(max_speed, self.velocity_x))
+        self.velocity_y = max(-max_speed, min(max_speed, self.velocity_y))
+
+        # Update position
+        self.world_x += self.velocity_x
+        self.world_y += self.velocity_y
+
+        # World wrapping for X
+        if self.world_x < 0:
+            self.world_x = self.world.width
+        if self.world_x > self.world.width:
+            self.world_x = 0
+
+        # Screen boundaries for Y
+        current_ground_y = self.world.terrain.height_at(self.world_x)
+        if self.world_y < 60:  # Scanner area
+            self.world_y = 60
+            self.velocity_y = 0
+        if self.world_y > current_ground_y - 10:  # Variable ground level
+            self.world_y = current_ground_y - 10
+            self.velocity_y = 0
+
+    def shoot(self):
+        # Shoot in facing direction
+        direction = 1 if self.facing_right else -1
+        self.world.spawn_laser(self.world_x, self.world_y, direction)
+        self.world.events.append(SOUND_LASER)
+
+    def respawn(self):
+        self.world_x = self.world.camera_x + SCREEN_WIDTH / 2
+        self.world_y = SCREEN_HEIGHT / 2
+        self.velocity_x = 0
+        self.velocity_y = 0
+        self.invincible = True
+        self.invincible_timer = 120 # 2 seconds at 60 FPS
+
+class Laser(SharedImage, pygame.sprite.Sprite):
+    image_key = "laser"
+
+    def __init__(self, world, x, y, direction=1):
+        super().__init__()
+        self.world = world
+        self.rect = self.image.get_rect()
+        self.world_x = x
+        self.world_y = y
+        self.speed_x = 15 * direction
+        self.direction = direction
+
+    def update(self):
+        self.world_x += self.speed_x
+
+        # Remove laser if it goes off-world
+        if self.world_x < -100 or self.world_x > self.world.width + 100:
+            self.kill()
+
+class Lander(SharedImage, pygame.sprite.Sprite):
+    image_key = "lander"
+    # AI schedule (see lod.AIScheduler); unused unless World(ai_lod=True)
+    next_update = 0
+    update_steps = 1
+    lod_order = 0
+
+    def __init__(self, world):
+        super().__init__()
+        self.world = world
+        self.rect = self.image.get_rect()
+        rng = world.rng
+        self.world_x = rng.randint(0, world.width)
+        self.world_y = rng.randint(80, 200)
+        self.velocity_x = rng.uniform(-2, 2)
+        self.velocity_y = rng.uniform(0.5, 1.5)
+        self.target_humanoid = None
+        self.has_humanoid = False
+
+    def update(self, steps=1):
+        """Runs the state machine; `steps` > 1 covers that many frames in one go."""
+        # STATE 1: ASCENDING (highest priority)
+        if self.has_humanoid:
+            if self.target_humanoid and self.target_humanoid.alive():
+                self.world_y -= 2 * steps
+                self.target_humanoid.world_x = self.world_x
+                self.target_humanoid.world_y = self.world_y + 25
+                if self.world_y < 0:  # Escaped to top
+                    # CHANGE: Spawn a Mutant
+                    self.world.spawn_mutant(self.world_x, self.world_y)
+                    self.target_humanoid.kill()
+                    self.kill()
+            else: # Target was killed
+                self.has_humanoid = False
+                self.target_humanoid = None
+            return
+
+        # STATE 2: FIND A TARGET (assigned for all Landers at the start of the frame)
+        if not self.has_valid_target():
+            # Lost it to another Lander this frame; a new one comes next frame
+            self.target_humanoid = None
+
+        # STATE 3: ACT (PURSUE or WANDER)
+        if self.target_humanoid:
+            # Pursue target
+            dx = self.target_humanoid.world_x - self.world_x
+            dy = self.target_humanoid.world_y - self.world_y
+
+            # CHANGE: Increased pursuit speed
+            if abs(dx) > 5:
+                self.world_x += (2.5 if dx > 0 else -2.5) * pursuit_moves(dx, 2.5, steps)
+            if abs(dy) > 5:
+                self.world_y += (2.0 if dy > 0 else -2.0) * pursuit_moves(dy, 2.0, steps)
+
+            # Check for successful abduction
+            if abs(dx) < GRAB_DISTANCE and abs(dy) < GRAB_DISTANCE:
+                self.has_humanoid = True
+                self.target_humanoid.is_abducted = True
+        else:
+            # No valid target, so wander randomly
+            self.world_x += self.velocity_x * steps
+            self.world_y += self.velocity_y * steps
+
+            # Bounce off side and top boundaries, but not ground
+            if self.world_x <= 0 or self.world_x >= self.world.width:
+                self.velocity_x *= -1
+            if self.world_y <= 80:
+                self.velocity_y = abs(self.velocity_y)
+
+    def has_valid_target(self):
+        target = self.target_humanoid
+        return target is not None and target.alive() and not target.is_abducted
+
+    def far_steps(self, period):
+        """Frames this Lander may skip while far from the camera without missing an event."""
+        if self.has_humanoid:
+            return max(1, min(period, int(self.world_y // 2) + 1)) # Lands on the frame it escapes
+        target = self.target_humanoid
+        if target is not None:
+            reach = GRAB_DISTANCE + 2.5 * period
+            if abs(target.world_x - self.world_x) < reach and abs(target.world_y - self.world_y) < reach:
+                return 1 # Close enough to grab within a turn
+        return period
+
+def pursuit_moves(distance, speed, steps):
+    """How many of `steps` frames a pursuing Lander keeps moving along one axis.
+
+    It stops once within 5 px, so a long step mustn't carry it past the target.
+    """
+    if steps == 1:
+        return 1
+    return min(steps, math.ceil((abs(distance) - 5) / speed))
+
+class Mutant(SharedImage, pygame.sprite.Sprite):
+    """A fast, aggressive enemy that hunts the player."""
+    image_key = "mutant"
+    next_update = 0
+    update_steps = 1
+    lod_order = 0
+
+    def __init__(self, world, x, y):
+        super().__init__()
+        self.world = world
+        self.rect = self.image.get_rect(center=(x, y))
+        self.world_x = x
+        self.world_y = y
+        self.speed = 4
+
+    def update(self, steps=1):
+        # Simple homing behavior
+        player = self.world.player
+        dx = player.world_x - self.world_x
+        dy = player.world_y - self.world_y
+        dist = math.hypot(dx, dy)
+
+        if dist > 0:
+            # Move towards player
+            self.world_x += (dx / dist) * self.speed * steps
+            self.world_y += (dy / dist) * self.speed * steps
+
+        # World wrapping
+        if self.world_x < 0: self.world_x = self.world.width
+        if self.world_x > self.world.width: self.world_x = 0
+        if self.world_y < 0: self.world_y = SCREEN_HEIGHT
+        if self.world_y > SCREEN_HEIGHT: self.world_y = 0
+
+    def far_steps(self, period):
+        return period
+
+class Humanoid(SharedImage, pygame.sprite.Sprite):
+    image_key = "humanoid"
+
+    def __init__(self, world):
+        super().__init__()
+        self.world = world
+        self.rect = self.image.get_rect()
+        self.world_x = world.rng.randint(50, world.width - 50)
+        self.world_y = world.terrain.height_at(self.world_x) - 7 # Spawn on variable terrain
+        self.uid = world.next_uid # Stable id so Landers can refer to us by number
+        world.next_uid += 1
+        world.humanoids_by_uid[self.uid] = self
+        self.velocity_y = 0
+        self.is_abducted = False
+        self.is_falling = False
+        self.is_carried = False
+        self.is_dead = False
+        self.death_timer = 0
+        self.fall_start_y = 0
+
+    def update(self):
+        if self.is_carried:
+            # Stick to the player
+            self.world_x = self.world.player.world_x
+            self.world_y = self.world.player.world_y + 20 # Position below the player
+            return
+
+        if self.is_falling:
+            self.velocity_y += 0.02
+            self.world_y += self.velocity_y
+
+            # Hit ground
+            current_ground_y = self.world.terrain.height_at(self.world_x)
+            if self.world_y >= current_ground_y - 7:
+                self.world_y = current_ground_y - 7
+                self.is_falling = False
+                self.velocity_y = 0
+
+                fall_distance = self.world_y - self.fall_start_y
+                if fall_distance > FALL_DAMAGE_DISTANCE:
+                    # Die from long fall
+                    self.is_dead = True
+                    self.image_key = "humanoid_dead"
+                    self.world.events.append(SOUND_HUMANOID_DEATH)
+                else:
+                    # Survived short fall
+                    pass # Just lands safely
+
+        if self.is_dead:
+            self.death_timer += 1
+            if self.death_timer > 60: # 1 second at 60 FPS
+                self.kill()
+
+    def kill(self):
+        self.world.humanoids_by_uid.pop(self.uid, None)
+        super().kill()
+
+# --- Array-Backed Entities ---
+# With World(use_entity_store=True) these replace the classes above. They
+# behave the same, but their state lives in EntityStore columns that are
+# updated for all entities at once.
+class StoredLaser(ArrayBacked, Laser):
+    world_x = Column("x")
+    world_y = Column("y")
+    speed_x = Column("speed_x")
+    direction = Column("direction")
+
+    def __init__(self, world, x, y, direction=1):
+        self._bind(world.store.lasers)
+        super().__init__(world, x, y, direction)
+
+class StoredLander(ArrayBacked, Lander):
+    world_x = Column("x")
+    world_y = Column("y")
+    velocity_x = Column("vx")
+    velocity_y = Column("vy")
+    has_humanoid = Column("has_humanoid")
+    target_uid = Column("target")
+
+    def __init__(self, world):
+        self._bind(world.store.landers)
+        super().__init__(world)
+
+    @property
+    def target_humanoid(self):
+        uid = self.target_uid
+        return None if uid < 0 else self.world.humanoids_by_uid.get(uid)
+
+    @target_humanoid.setter
+    def target_humanoid(self, humanoid):
+        self.target_uid = -1 if humanoid is None else humanoid.uid
+
+class StoredMutant(ArrayBacked, Mutant):
+    world_x = Column("x")
+    world_y = Column("y")
+    speed = Column("speed")
+
+    def __init__(self, world, x, y):
+        self._bind(world.store.mutants)
+        super().__init__(world, x, y)
+
+# --- World ---
+class DrawGroup(pygame.sprite.Group):
+    """A Group that numbers sprites as they join (`draw_order`), so a few of
+    them can be put back in group order without walking the whole group."""
+    def __init__(self, *sprites):
+        self.joined = 0
+        super().__init__(*sprites)
+
+    def add_internal(self, sprite, layer=None):
+        sprite.draw_order = self.joined
+        self.joined += 1
+        super().add_internal(sprite, layer)
+
+class World:
+    """The complete game state, stepped one frame at a time without a display.
+
+    Runs the same update, collision and spawn rules as the original main loop
+    but never renders or plays audio, so it can be driven as fast as the CPU
+    allows. Sounds that should accompany a frame are collected in `events`.
+
+    With `ai_lod` set, enemies far from the camera think at a reduced rate
+    (see lod.AIScheduler), so huge worlds cost roughly what is near the
+    player. It changes how the game plays, so it is off by default.
+
+    With `waves` set, a WaveDirector brings the enemies in waves instead of
+    the `num_landers` at the start and two more whenever fewer than three
+    are left.
+    """
+    def __init__(self, width=WORLD_WIDTH, num_humanoids=10, num_landers=6, exclusive_targets=False,
+                 use_entity_store=False, particle_capacity=2048, seed=None, ai_lod=False, waves=False):
+        if ai_lod and use_entity_store:
+            raise ValueError("ai_lod schedules sprite enemies; the entity store already updates them in bulk")
+        self.width = width
+        # All randomness comes from these, so a seed fixes the whole game
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.np_rng = np.random.default_rng(seed)
+        self.targeting = TargetingService(exclusive=exclusive_targets)
+        # Optional array storage for the numerous entity types
+        self.store = EntityStore(SCREEN_HEIGHT) if use_entity_store else None
+        self.humanoids_by_uid = {}
+        self.next_uid = 0
+        self.frame = 0
+        self.ai = AIScheduler(SCREEN_WIDTH) if ai_lod else None
+
+        self.all_sprites = DrawGroup()
+        self.enemies = pygame.sprite.Group()
+        self.landers = pygame.sprite.Group()
+        self.lasers = pygame.sprite.Group()
+        self.humanoids = pygame.sprite.Group()
+        self.particles = ParticlePool(particle_capacity, self.np_rng)
+
+        # World-space broad phases, rebuilt every frame
+        self.enemy_index = SweepIndex(self.width)
+        self.humanoid_index = SweepIndex(self.width)
+        self._indexed_enemies = []
+
+        # Generate terrain points for more varied landscape
+        self.terrain = Terrain.generate(self.width, GROUND_LEVEL, rng=self.rng)
+
+        self.player = Player(self)
+        self.all_sprites.add(self.player)
+
+        # Create humanoids
+        for _ in range(num_humanoids):
+            self.spawn_humanoid()
+
+        # Create landers
+        self.waves = WaveDirector(atlas=SPRITES) if waves else None
+        if self.waves is not None:
+            self.waves.start(self, 1) # Its enemies arrive over the first frames
+        else:
+            for _ in range(num_landers):
+                self.spawn_lander()
+
+        self.camera_x = self.player.world_x - SCREEN_WIDTH / 2
+        self.score = 0
+        self.game_over = False
+        self.inputs = Inputs()
+        self.events = []
+
+        self.profiler = NULL_PROFILER # Swap in a profiler.Profiler to time each phase
+
+        # Where things were before the last step, for interpolated rendering
+        self.interpolate = False # Sprite positions are only kept when True
+        self.previous_camera_x = self.camera_x
+        self.previous_positions = {}
+
+    # --- Spawning ---
+    def spawn_humanoid(self):
+        h = Humanoid(self)
+        self.all_sprites.add(h)
+        self.humanoids.add(h)
+        return h
+
+    def spawn_laser(self, x, y, direction):
+        laser = (StoredLaser if self.store else Laser)(self, x, y, direction)
+        self.all_sprites.add(laser)
+        self.lasers.add(laser)
+        return laser
+
+    def spawn_lander(self):
+        e = (StoredLander if self.store else Lander)(self)
+        self.all_sprites.add(e)
+        self.enemies.add(e)
+        self.landers.add(e)
+        if self.ai is not None:
+            self.ai.add(e, self.frame)
+        return e
+
+    def spawn_mutant(self, x, y):
+        mutant = (StoredMutant if self.store else Mutant)(self, x, y)
+        self.all_sprites.add(mutant)
+        self.enemies.add(mutant)
+        if self.ai is not None:
+            self.ai.add(mutant, self.frame)
+        return mutant
+
+    def create_explosion(self, x, y, color):
+        """Creates a burst of particles at a given location."""
+        self.particles.emit(x, y, color, 15)
+
+    # --- Camera ---
+    def update_camera(self):
+        # Smooth camera following with proper viewport mechanics
+        target_x = self.player.world_x - SCREEN_WIDTH / 2
+        self.camera_x += (target_x - self.camera_x) * 0.1
+
+        # Keep camera within world bounds
+        self.camera_x = max(0, min(self.width - SCREEN_WIDTH, self.camera_x))
+
+    def remember_positions(self):
+        """Keeps the camera and (when interpolating) sprite positions from before this frame."""
+        self.previous_camera_x = self.camera_x
+        if self.interpolate:
+            self.previous_positions = {sprite: (sprite.world_x, sprite.world_y) for sprite in self.all_sprites}
+
+    # --- Frame ---
+    def step(self, inputs):
+        """Advances the world by one frame. Returns False once the game is over."""
+        self.events = []
+        self.inputs = inputs
+        player = self.player
+        self.remember_positions()
+
+        if inputs.fire:
+            player.shoot()
+        if inputs.bomb and player.bombs > 0:
+            self.detonate_smart_bomb()
+
+        if self.game_over:
+            return False
+
+        self.frame += 1
+        profiler = self.profiler
+
+        # --- Update ---
+        due = self.ai.due(self.frame) if self.ai is not None else None
+        with profiler.scope("targeting"):
+            self.assign_lander_targets(None if due is None else [e for e in due if isinstance(e, Lander)])
+        if self.store is not None:
+            # Only the unique entities update one by one; the rest move in bulk
+            with profiler.scope("update.Player"):
+                self.player.update()
+            with profiler.scope("update.Humanoid"):
+                self.humanoids.update()
+            self.store.update(self)
+        elif due is not None:
+            self.update_scheduled(due)
+        else:
+            self.update_sprites()
+        with profiler.scope("update.particles"):
+            self.particles.update()
+        self.update_camera()
+
+        # Collision: Laser hits Lander
+        with profiler.scope("collide_lasers"):
+            hits = self.collide_lasers()
+        for hit in hits:
+            self.score += 150
+            self.events.append(SOUND_EXPLOSION)
+            color = ORANGE if isinstance(hit, Mutant) else GREEN
+            self.create_explosion(hit.world_x, hit.world_y, color)
+            # Release humanoid if lander was carrying one
+            if isinstance(hit, Lander) and hit.has_humanoid and hit.target_humanoid and hit.target_humanoid.alive():
+                hit.target_humanoid.is_abducted = False
+                hit.target_humanoid.is_falling = True
+                hit.target_humanoid.fall_start_y = hit.target_humanoid.world_y
+
+        # Collision: Player hits Lander
+        if not player.invincible:
+            with profiler.scope("collide_player"):
+                hits = self.collide_player()
+            if hits:
+                player.lives -= 1
+                self.events.append(SOUND_EXPLOSION)
+                for hit in hits: # Create explosion for each enemy hit
+                    color = ORANGE if isinstance(hit, Mutant) else GREEN
+                    self.create_explosion(hit.world_x, hit.world_y, color)
+
+                if player.lives <= 0:
+                    self.game_over = True
+                else:
+                    # No level reset, just respawn player
+                    player.respawn()
+
+        # Player catches/releases humanoid
+        with profiler.scope("catch"):
+            if player.carried_humanoid:
+                # Check for release condition
+                current_ground_y = self.terrain.height_at(player.world_x)
+                if player.world_y >= current_ground_y - 10:
+                    player.carried_humanoid.is_carried = False
+                    player.carried_humanoid.world_y = current_ground_y - 8
+                    player.carried_humanoid = None
+                    self.score += 1000 # Bonus for safe delivery
+                    self.events.append(SOUND_RESCUE)
+            else:
+                # Check for catch condition
+                h = self.find_catchable_humanoid()
+                if h is not None:
+                    h.is_falling = False
+                    h.is_carried = True
+                    h.velocity_y = 0
+                    player.carried_humanoid = h
+                    self.events.append(SOUND_RESCUE)
+
+        # Spawn new enemies if too few remain
+        if self.waves is not None:
+            with profiler.scope("spawn"):
+                self.waves.update(self)
+        elif len(self.enemies) < 3:
+            with profiler.scope("spawn"):
+                for _ in range(2):
+                    self.spawn_lander()
+
+        # Check if all humanoids are gone
+        if len(self.humanoids) == 0:
+            self.game_over = True
+
+        if self.store is not None:
+            self.store.compact() # Enemies shot or rammed this frame
+
+        if profiler.enabled:
+            self.count_entities()
+        return True
+
+    def update_sprites(self):
+        """all_sprites.update(), timed per entity class when profiling."""
+        profiler = self.profiler
+        if not profiler.enabled:
+            self.all_sprites.update()
+            return
+        clock = time.perf_counter
+        spent = {}
+        for sprite in self.all_sprites.sprites():
+            start = clock()
+            sprite.update()
+            name = type(sprite).__name__
+            spent[name] = spent.get(name, 0.0) + clock() - start
+        for name, seconds in spent.items():
+            profiler.add("update." + name, seconds)
+
+    def update_scheduled(self, due):
+        """Updates everything but the enemies, then the enemies whose turn it is (ai_lod)."""
+        profiler = self.profiler
+        with profiler.scope("update.Player"):
+            self.player.update()
+        with profiler.scope("update.Humanoid"):
+            self.humanoids.update()
+        with profiler.scope("update.Laser"):
+            self.lasers.update()
+        with profiler.scope("update.enemies"):
+            for enemy in due:
+                enemy.update(enemy.update_steps)
+            ai = self.ai
+            for enemy in due:
+                ai.reschedule(enemy, self.frame, self.camera_x)
+        if profiler.enabled:
+            profiler.gauge("enemies_updated", len(due))
+
+    def count_entities(self):
+        profiler = self.profiler
+        profiler.gauge("sprites", len(self.all_sprites))
+        profiler.gauge("enemies", len(self.enemies))
+        profiler.gauge("landers", len(self.landers))
+        profiler.gauge("lasers", len(self.lasers))
+        profiler.gauge("humanoids", len(self.humanoids))
+        profiler.gauge("particles", len(self.particles))
+
+    # --- AI ---
+    def assign_lander_targets(self, landers=None):
+        """Gives every Lander (or just `landers`) without a live, unclaimed target its nearest free humanoid."""
+        if self.store is not None:
+            self.store.assign_lander_targets(self)
+            return
+        seekers = []
+        chased = set()
+        if landers is None:
+            landers = self.landers.sprites()
+        elif self.targeting.exclusive:
+            # Landers waiting for their turn keep their claims
+            chased.update(e.target_humanoid for e in self.landers if not e.has_humanoid and e.has_valid_target())
+        for lander in landers:
+            if lander.has_humanoid:
+                continue
+            if lander.has_valid_target():
+                chased.add(lander.target_humanoid)
+            else:
+                lander.target_humanoid = None
+                seekers.append(lander)
+        if not seekers:
+            return
+
+        available = [h for h in self.humanoids.sprites() if not h.is_abducted]
+        if not available:
+            return
+        taken = [h in chased for h in available]
+        picks = self.targeting.assign(
+            [e.world_x for e in seekers], [e.world_y for e in seekers],
+            [h.world_x for h in available], [h.world_y for h in available],
+            taken,
+        )
+        for lander, pick in zip(seekers, picks.tolist()):
+            if pick >= 0:
+                lander.target_humanoid = available[pick]
+
+    # --- Collisions ---
+    def collide_lasers(self):
+        """Kills every enemy touched by a laser, and the lasers that hit it.
+
+        Enemies are resolved in group order and a laser is spent on the first
+        enemy it hits. Returns the enemies that were destroyed.
+        """
+        enemies, *enemy_boxes = self.collision_boxes(self.enemies)
+        lasers, *laser_boxes = self.collision_boxes(self.lasers)
+        self.enemy_index.build(*enemy_boxes)
+        self._indexed_enemies = enemies
+        if not enemies or not lasers:
+            return []
+
+        laser_ids, enemy_ids = self.enemy_index.query_pairs(*laser_boxes)
+        order = np.lexsort((laser_ids, enemy_ids))
+        hits = []
+        for e, l in zip(enemy_ids[order].tolist(), laser_ids[order].tolist()):
+            laser = lasers[l]
+            if not laser.alive(): # Already spent on an earlier enemy
+                continue
+            laser.kill()
+            enemy = enemies[e]
+            if not hits or hits[-1] is not enemy:
+                hits.append(enemy)
+        for enemy in hits:
+            enemy.kill()
+        return hits
+
+    def collision_boxes(self, group):
+        """Returns (sprites, xs, ys, half_ws, half_hs) for the enemies or lasers group."""
+        if self.store is not None:
+            if group is self.enemies:
+                return self.store.boxes(self.store.landers, self.store.mutants)
+            if group is self.lasers:
+                return self.store.boxes(self.store.lasers)
+        sprites = group.sprites()
+        return (sprites,) + box_arrays(sprites)
+
+    def collide_player(self):
+        """Kills and returns the enemies touching the player (uses the index from collide_lasers)."""
+        player = self.player
+        enemies = self._indexed_enemies
+        hits = []
+        for e in self.enemy_index.query_box(player.world_x, player.world_y, player.rect.width / 2, player.rect.height / 2).tolist():
+            enemy = enemies[e]
+            if enemy.alive():
+                enemy.kill()
+                hits.append(enemy)
+        return hits
+
+    def find_catchable_humanoid(self):
+        """Returns the first falling humanoid within reach of the player, if any."""
+        falling = [h for h in self.humanoids.sprites() if h.is_falling]
+        if not falling:
+            return None
+        player = self.player
+        self.humanoid_index.build(*box_arrays(falling))
+        for i in self.humanoid_index.query_box(player.world_x, player.world_y, CATCH_DISTANCE, CATCH_DISTANCE).tolist():
+            h = falling[i]
+            dx = (player.world_x - h.world_x + self.width / 2) % self.width - self.width / 2 # Shortest way round
+            distance = math.hypot(dx, player.world_y - h.world_y)
+            if distance < CATCH_DISTANCE:  # Close enough to catch
+                return h
+        return None
+
+    def detonate_smart_bomb(self):
+        """Destroys every enemy on screen."""
+        self.player.bombs -= 1
+        for enemy in list(self.enemies):
+            # Only destroy enemies on screen
+            if self.camera_x - 50 < enemy.world_x < self.camera_x + SCREEN_WIDTH + 50:
+                if isinstance(enemy, Lander) and enemy.has_humanoid and enemy.target_humanoid:
+                    enemy.target_humanoid.is_abducted = False
+                    enemy.target_humanoid.is_falling = True
+                    enemy.target_humanoid.fall_start_y = enemy.target_humanoid.world_y
+
+                color = ORANGE if isinstance(enemy, Mutant) else GREEN
+                self.create_explosion(enemy.world_x, enemy.world_y, color)
+                enemy.kill()
+                self.score += 100
+                self.events.append(SOUND_EXPLOSION)
+        if self.store is not None:
+            self.store.compact()
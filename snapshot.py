@@ -0,0 +1,441 @@
+"""Binary snapshots of a whole World.
+
+    data = snapshot.dumps(world)      # bytes
+    snapshot.loads(data, world)       # rewind `world` in place
+    other = snapshot.loads(data)      # or fork a new World from it
+
+A snapshot is a fixed struct header followed by length-prefixed sections,
+each a NumPy structured array: the player, humanoids, landers, mutants and
+lasers, the order of everything in `all_sprites` (update and collision
+order depends on it), the terrain, the live particles and both random
+number generators. Enemies also keep their AI schedule (used with
+World(ai_lod=True)), and a WAVE section holds the wave director's counters. Links between entities (a lander's target, the humanoid
+the player carries) are stored as indices into the humanoid section, so
+nothing holds object references and no Sprite is pickled.
+
+Restoring into an existing World with the same settings reuses its groups,
+entity tables and particle pool; building a fresh World costs the terrain
+and pool allocation on top.
+"""
+import struct
+import numpy as np
+import pygame
+
+from simulation import (
+    SPRITES,
+    Humanoid, Lander, Laser, Mutant, StoredLander, StoredLaser, StoredMutant, World,
+)
+
+MAGIC = b"DFSS"
+FORMAT_VERSION = 3
+
+# Header flags
+STORE, EXCLUSIVE, GAME_OVER, SEEDED, GAUSS, AI_LOD, WAVES = (1 << i for i in range(7))
+
+HEADER = struct.Struct("<4sHHiiqqqqddiqqqq")
+SECTION = struct.Struct("<I")
+
+PLAYER = np.dtype([
+    ("x", "<f8"), ("y", "<f8"), ("vx", "<f8"), ("vy", "<f8"),
+    ("lives", "<i4"), ("bombs", "<i4"), ("facing_right", "?"), ("visible", "?"),
+    ("invincible", "?"), ("invincible_timer", "<i4"), ("carried", "<i4"),
+])
+HUMANOID = np.dtype([
+    ("uid", "<i8"), ("x", "<f8"), ("y", "<f8"), ("vy", "<f8"), ("fall_start_y", "<f8"),
+    ("abducted", "?"), ("falling", "?"), ("carried", "?"), ("dead", "?"), ("death_timer", "<i4"),
+])
+LANDER = np.dtype([
+    ("x", "<f8"), ("y", "<f8"), ("vx", "<f8"), ("vy", "<f8"),
+    ("target", "<i4"), ("has_humanoid", "?"),
+    ("next_update", "<i8"), ("update_steps", "<i4"), ("lod_order", "<i8"),
+])
+MUTANT = np.dtype([
+    ("x", "<f8"), ("y", "<f8"), ("speed", "<f8"),
+    ("next_update", "<i8"), ("update_steps", "<i4"), ("lod_order", "<i8"),
+])
+LASER = np.dtype([("x", "<f8"), ("y", "<f8"), ("speed_x", "<f8"), ("direction", "<i1")])
+ORDER = np.dtype([("kind", "<u1"), ("index", "<i4")])
+POINT = np.dtype([("x", "<f8"), ("y", "<f8")])
+PARTICLE = np.dtype([
+    ("slot", "<i4"), ("x", "<f8"), ("y", "<f8"), ("vx", "<f8"), ("vy", "<f8"),
+    ("lifespan", "<f8"), ("initial_lifespan", "<f8"), ("size", "<i1"), ("color", "<i2"),
+])
+COLOR = np.dtype([("r", "u1"), ("g", "u1"), ("b", "u1")])
+WAVE = np.dtype([("number", "<i4"), ("released", "<i4"), ("spawned", "<i4"), ("timer", "<i4"), ("intermission", "<i4")])
+PCG64 = np.dtype([("state", "<u8", 2), ("inc", "<u8", 2), ("has_uint32", "<i4"), ("uinteger", "<u4")])
+
+# Sprite kinds in the ORDER section
+PLAYER_KIND, HUMANOID_KIND, LANDER_KIND, MUTANT_KIND, LASER_KIND = range(5)
+SECTIONS = (PLAYER, HUMANOID, LANDER, MUTANT, LASER, ORDER, POINT, PARTICLE, COLOR, np.dtype("<u4"), PCG64, WAVE)
+
+# --- Earlier Versions ---
+# Layouts `read` still accepts, as (header, section dtypes). Later versions
+# only append header fields and sections and add fields to sections, so an
+# old snapshot is upgraded by filling in what it lacks: header fields with
+# 0, section fields from FIELD_DEFAULTS (else 0), sections left empty.
+V1_LANDER = np.dtype([
+    ("x", "<f8"), ("y", "<f8"), ("vx", "<f8"), ("vy", "<f8"),
+    ("target", "<i4"), ("has_humanoid", "?"),
+])
+V1_MUTANT = np.dtype([("x", "<f8"), ("y", "<f8"), ("speed", "<f8")])
+LAYOUTS = {
+    1: (struct.Struct("<4sHHiiqqqqddiqqq"),
+        (PLAYER, HUMANOID, V1_LANDER, V1_MUTANT, LASER, ORDER, POINT, PARTICLE, COLOR, np.dtype("<u4"), PCG64)),
+    2: (HEADER, SECTIONS[:-1]), # No WAVE section
+    FORMAT_VERSION: (HEADER, SECTIONS),
+}
+HEADER_FIELDS = len(HEADER.unpack(bytes(HEADER.size)))
+FIELD_DEFAULTS = {"update_steps": 1} # An enemy's AI schedule before its first turn
+
+# --- Saving ---
+def dumps(world):
+    """Serializes the full game state to bytes."""
+    pool = world.particles
+    flags = (STORE if world.store is not None else 0) | (EXCLUSIVE if world.targeting.exclusive else 0) \
+        | (GAME_OVER if world.game_over else 0) | (SEEDED if world.seed is not None else 0) \
+        | (AI_LOD if world.ai is not None else 0) | (WAVES if world.waves is not None else 0)
+    version, mt_state, gauss = world.rng.getstate()
+    if gauss is not None:
+        flags |= GAUSS
+
+    humanoids = world.humanoids.sprites()
+    humanoid_index = {h: i for i, h in enumerate(humanoids)}
+    landers, mutants, lasers = entity_lists(world)
+    index_of = {world.player: (PLAYER_KIND, 0)}
+    for kind, sprites in ((HUMANOID_KIND, humanoids), (LANDER_KIND, landers),
+                          (MUTANT_KIND, mutants), (LASER_KIND, lasers)):
+        for i, sprite in enumerate(sprites):
+            index_of[sprite] = (kind, i)
+
+    p = world.player
+    player = np.array([(
+        p.world_x, p.world_y, p.velocity_x, p.velocity_y, p.lives, p.bombs, p.facing_right, p.visible,
+        p.invincible, p.invincible_timer, humanoid_index.get(p.carried_humanoid, -1),
+    )], dtype=PLAYER)
+    humanoid_rows = np.array([(
+        h.uid, h.world_x, h.world_y, h.velocity_y, h.fall_start_y,
+        h.is_abducted, h.is_falling, h.is_carried, h.is_dead, h.death_timer,
+    ) for h in humanoids], dtype=HUMANOID)
+    lander_rows = np.array([(
+        e.world_x, e.world_y, e.velocity_x, e.velocity_y, humanoid_index.get(e.target_humanoid, -1), e.has_humanoid,
+        e.next_update, e.update_steps, e.lod_order,
+    ) for e in landers], dtype=LANDER)
+    mutant_rows = np.array([(m.world_x, m.world_y, m.speed, m.next_update, m.update_steps, m.lod_order)
+                            for m in mutants], dtype=MUTANT)
+    laser_rows = np.array([(l.world_x, l.world_y, l.speed_x, l.direction) for l in lasers], dtype=LASER)
+    order = np.array([index_of[s] for s in world.all_sprites.sprites()], dtype=ORDER)
+
+    terrain = np.empty(len(world.terrain.xs), dtype=POINT)
+    terrain["x"] = world.terrain.xs
+    terrain["y"] = world.terrain.ys
+
+    slots = pool.live_slots()
+    particles = np.empty(len(slots), dtype=PARTICLE)
+    particles["slot"] = slots
+    for name in ("x", "y", "vx", "vy", "lifespan", "initial_lifespan", "size", "color"):
+        particles[name] = getattr(pool, name)[slots]
+    palette = np.array([tuple(c[:3]) for c in pool.palette], dtype=COLOR)
+
+    np_state = world.np_rng.bit_generator.state
+    if np_state["bit_generator"] != "PCG64":
+        raise ValueError(f"can't snapshot a {np_state['bit_generator']} generator")
+    pcg = np.array([(
+        split128(np_state["state"]["state"]), split128(np_state["state"]["inc"]),
+        np_state["has_uint32"], np_state["uinteger"],
+    )], dtype=PCG64)
+
+    director = world.waves
+    waves = np.array([(director.number, director.released, director.spawned, director.timer, director.intermission)]
+                     if director is not None else [], dtype=WAVE)
+
+    header = HEADER.pack(
+        MAGIC, FORMAT_VERSION, flags, int(world.width), pool.capacity,
+        world.frame, world.score, world.next_uid, world.seed if world.seed is not None else 0,
+        world.camera_x, gauss if gauss is not None else 0.0,
+        pool.head, pool.peak, pool.emitted, pool.overwritten,
+        world.ai.spawned if world.ai is not None else 0,
+    )
+    parts = [header]
+    for array in (player, humanoid_rows, lander_rows, mutant_rows, laser_rows, order, terrain,
+                  particles, palette, np.array(mt_state, dtype="<u4"), pcg, waves):
+        data = array.tobytes()
+        parts.append(SECTION.pack(len(data)))
+        parts.append(data)
+    return b"".join(parts)
+
+def entity_lists(world):
+    """Landers, mutants and lasers in the order they update and collide in."""
+    if world.store is not None:
+        store = world.store
+        return list(store.landers.owners), list(store.mutants.owners), list(store.lasers.owners)
+    enemies = world.enemies.sprites()
+    return ([e for e in enemies if isinstance(e, Lander)], [e for e in enemies if isinstance(e, Mutant)],
+            world.lasers.sprites())
+
+def split128(value):
+    return (value & 0xFFFFFFFFFFFFFFFF, value >> 64)
+
+def join128(words):
+    return int(words[0]) | int(words[1]) << 64
+
+# --- Loading ---
+def read(data):
+    """Returns (header fields, section arrays) without touching any World.
+
+    Snapshots in an earlier layout (see LAYOUTS) come back upgraded to the
+    current one. Raises ValueError for anything that isn't a complete
+    snapshot this version can read.
+    """
+    view = memoryview(data)
+    if bytes(view[:4]) != MAGIC:
+        raise ValueError("not a world snapshot")
+    try:
+        (version,) = struct.unpack_from("<H", view, 4)
+        if version not in LAYOUTS:
+            raise ValueError(f"unsupported snapshot version {version}")
+        header, dtypes = LAYOUTS[version]
+        fields = header.unpack_from(view)
+        offset = header.size
+        sections = []
+        for dtype in dtypes:
+            (size,) = SECTION.unpack_from(view, offset)
+            offset += SECTION.size
+            sections.append(np.frombuffer(view, dtype=dtype, count=size // dtype.itemsize, offset=offset))
+            offset += size
+    except struct.error:
+        raise ValueError("truncated snapshot") from None
+    if version != FORMAT_VERSION:
+        fields += (0,) * (HEADER_FIELDS - len(fields))
+        sections += [np.empty(0, dtype=dtype) for dtype in SECTIONS[len(sections):]]
+        sections = [rows if rows.dtype == dtype else upgrade(rows, dtype) for rows, dtype in zip(sections, SECTIONS)]
+    return fields, sections
+
+def upgrade(rows, dtype):
+    """`rows` converted to `dtype`; fields they lack get FIELD_DEFAULTS, else 0."""
+    upgraded = np.zeros(len(rows), dtype=dtype)
+    for name in dtype.names:
+        upgraded[name] = rows[name] if name in rows.dtype.names else FIELD_DEFAULTS.get(name, 0)
+    return upgraded
+
+def loads(data, world=None):
+    """Restores a snapshot into `world` (which must have the same settings), or into a new World.
+
+    Returns the restored World.
+    """
+    fields, sections = read(data)
+    (_, _, flags, width, capacity, frame, score, next_uid, seed, camera_x, gauss,
+     head, peak, emitted, overwritten, spawned) = fields
+    (player, humanoids, landers, mutants, lasers, order, terrain, particles, palette,
+     mt_state, pcg, waves) = sections
+    stored = bool(flags & STORE)
+    lod = bool(flags & AI_LOD)
+    directed = bool(flags & WAVES)
+    if world is None:
+        world = World(width=width, num_humanoids=0, num_landers=0, exclusive_targets=bool(flags & EXCLUSIVE),
+                      use_entity_store=stored, particle_capacity=capacity, ai_lod=lod, waves=directed)
+    elif ((world.store is not None) != stored or (world.ai is not None) != lod
+          or (world.waves is not None) != directed or world.width != width
+          or world.particles.capacity != capacity):
+        raise ValueError("snapshot was taken from a World with different settings")
+
+    world.seed = seed if flags & SEEDED else None
+    world.frame = frame
+    world.score = score
+    world.next_uid = next_uid
+    world.camera_x = camera_x
+    world.previous_camera_x = camera_x
+    world.previous_positions = {}
+    world.game_over = bool(flags & GAME_OVER)
+    world.events = []
+
+    restore_terrain(world, terrain)
+    humanoid_sprites = restore_humanoids(world, humanoids)
+    lander_sprites = restore_landers(world, landers, humanoid_sprites)
+    mutant_sprites = restore_simple(world, mutants, StoredMutant if stored else Mutant,
+                                    world.store.mutants if stored else None,
+                                    (("world_x", "x"), ("world_y", "y"), ("speed", "speed")))
+    laser_sprites = restore_simple(world, lasers, StoredLaser if stored else Laser,
+                                   world.store.lasers if stored else None,
+                                   (("world_x", "x"), ("world_y", "y"), ("speed_x", "speed_x"), ("direction", "direction")))
+    restore_player(world, player[0], humanoid_sprites)
+    restore_groups(world, order, (
+        [world.player], humanoid_sprites, lander_sprites, mutant_sprites, laser_sprites,
+    ))
+    restore_particles(world.particles, particles, palette, head, peak, emitted, overwritten)
+    if lod:
+        restore_schedule(world, landers, lander_sprites, mutants, mutant_sprites, spawned)
+    if directed:
+        restore_waves(world.waves, waves[0])
+
+    world.rng.setstate((3, tuple(mt_state.tolist()), gauss if flags & GAUSS else None))
+    world.np_rng.bit_generator.state = {
+        "bit_generator": "PCG64",
+        "state": {"state": join128(pcg[0]["state"]), "inc": join128(pcg[0]["inc"])},
+        "has_uint32": int(pcg[0]["has_uint32"]),
+        "uinteger": int(pcg[0]["uinteger"]),
+    }
+    return world
+
+def blank(cls, world, table=None):
+    """An entity of class `cls` made without running its constructor (which would spawn it randomly)."""
+    sprite = cls.__new__(cls)
+    pygame.sprite.Sprite.__init__(sprite)
+    sprite.world = world
+    sprite.rect = SPRITES[cls.image_key].get_rect()
+    if table is not None:
+        sprite._table = table
+        sprite._row = len(table.owners)
+        table.owners.append(sprite)
+    return sprite
+
+def restore_terrain(world, terrain):
+    t = world.terrain
+    if len(t.xs) == len(terrain) and np.array_equal(t.xs, terrain["x"]):
+        changed = np.flatnonzero(t.ys != terrain["y"])
+        t.set_heights(changed.tolist(), terrain["y"][changed].tolist()) # Listeners redraw only what moved
+        return
+    fresh = type(t)(zip(terrain["x"].tolist(), terrain["y"].tolist()), t.fallback)
+    fresh.listeners = t.listeners
+    world.terrain = fresh
+    for listener in fresh.listeners:
+        listener(fresh.min_x, fresh.max_x)
+
+def restore_humanoids(world, rows):
+    world.humanoids_by_uid = {}
+    sprites = []
+    for uid, x, y, vy, fall_start_y, abducted, falling, carried, dead, death_timer in rows.tolist():
+        h = blank(Humanoid, world)
+        h.uid = uid
+        h.world_x = x
+        h.world_y = y
+        h.velocity_y = vy
+        h.fall_start_y = fall_start_y
+        h.is_abducted = abducted
+        h.is_falling = falling
+        h.is_carried = carried
+        h.is_dead = dead
+        h.death_timer = death_timer
+        if dead:
+            h.image_key = "humanoid_dead"
+        world.humanoids_by_uid[uid] = h
+        sprites.append(h)
+    return sprites
+
+def restore_landers(world, rows, humanoids):
+    if world.store is not None:
+        table = reset_table(world.store.landers, len(rows))
+        for name, field in (("x", "x"), ("y", "y"), ("vx", "vx"), ("vy", "vy"), ("has_humanoid", "has_humanoid")):
+            table.columns[name][:len(rows)] = rows[field]
+        uids = np.array([h.uid for h in humanoids] + [-1], dtype=np.int64)
+        table.columns["target"][:len(rows)] = uids[rows["target"]] # -1 picks the trailing "no target"
+        return [blank(StoredLander, world, table) for _ in range(len(rows))]
+
+    sprites = []
+    for x, y, vx, vy, target, has_humanoid, *_ in rows.tolist():
+        e = blank(Lander, world)
+        e.world_x = x
+        e.world_y = y
+        e.velocity_x = vx
+        e.velocity_y = vy
+        e.target_humanoid = humanoids[target] if target >= 0 else None
+        e.has_humanoid = has_humanoid
+        sprites.append(e)
+    return sprites
+
+def restore_simple(world, rows, cls, table, fields):
+    """Restores an entity type with no links to others (mutants, lasers)."""
+    if table is not None:
+        reset_table(table, len(rows))
+        for attr, field in fields:
+            table.columns[cls.__dict__[attr].field][:len(rows)] = rows[field]
+        return [blank(cls, world, table) for _ in range(len(rows))]
+
+    sprites = []
+    columns = [rows[field].tolist() for attr, field in fields]
+    for values in zip(*columns):
+        sprite = blank(cls, world)
+        for (attr, field), value in zip(fields, values):
+            setattr(sprite, attr, value)
+        sprites.append(sprite)
+    return sprites
+
+def reset_table(table, count):
+    """Empties an EntityTable and makes room for `count` rows, to be filled column by column."""
+    table.compact()
+    for owner in table.owners:
+        owner._detached = table.row_values(owner._row) if owner._row < table.count else {}
+        owner._table = None # Anything still holding an old sprite reads its last values
+    table.owners = []
+    table.reserve(count)
+    table.count = count
+    table.alive[:count] = True
+    return table
+
+def restore_player(world, row, humanoids):
+    p = world.player
+    p.world_x = float(row["x"])
+    p.world_y = float(row["y"])
+    p.velocity_x = float(row["vx"])
+    p.velocity_y = float(row["vy"])
+    p.lives = int(row["lives"])
+    p.bombs = int(row["bombs"])
+    p.facing_right = bool(row["facing_right"])
+    p.visible = bool(row["visible"])
+    p.invincible = bool(row["invincible"])
+    p.invincible_timer = int(row["invincible_timer"])
+    carried = int(row["carried"])
+    p.carried_humanoid = humanoids[carried] if carried >= 0 else None
+
+def restore_groups(world, order, sprites_by_kind):
+    for group in (world.all_sprites, world.enemies, world.landers, world.lasers, world.humanoids):
+        group.empty()
+    groups_by_kind = (
+        (world.all_sprites,),
+        (world.all_sprites, world.humanoids),
+        (world.all_sprites, world.enemies, world.landers),
+        (world.all_sprites, world.enemies),
+        (world.all_sprites, world.lasers),
+    )
+    for kind, index in order.tolist():
+        sprite = sprites_by_kind[kind][index]
+        for group in groups_by_kind[kind]:
+            group.add_internal(sprite)
+            sprite.add_internal(group)
+
+def restore_schedule(world, landers, lander_sprites, mutants, mutant_sprites, spawned):
+    for rows, sprites in ((landers, lander_sprites), (mutants, mutant_sprites)):
+        columns = (rows["next_update"].tolist(), rows["update_steps"].tolist(), rows["lod_order"].tolist())
+        for sprite, next_update, update_steps, lod_order in zip(sprites, *columns):
+            sprite.next_update = next_update
+            sprite.update_steps = update_steps
+            sprite.lod_order = lod_order
+    world.ai.rebuild(lander_sprites + mutant_sprites, spawned)
+
+def restore_waves(director, row):
+    director.set_wave(int(row["number"]))
+    director.released = int(row["released"])
+    director.spawned = int(row["spawned"])
+    director.timer = int(row["timer"])
+    director.intermission = int(row["intermission"])
+    director.last_spawns = 0
+
+def restore_particles(pool, rows, palette, head, peak, emitted, overwritten):
+    pool.lifespan[:] = 0
+    slots = rows["slot"]
+    for name in ("x", "y", "vx", "vy", "lifespan", "initial_lifespan", "size", "color"):
+        getattr(pool, name)[slots] = rows[name]
+    pool.palette = [tuple(c) for c in palette.tolist()]
+    pool._palette_index = {color: i for i, color in enumerate(pool.palette)}
+    pool.head = head
+    pool.peak = peak
+    pool.emitted = emitted
+    pool.overwritten = overwritten
+
+# --- Files ---
+def save(world, path):
+    with open(path, "wb") as f:
+        f.write(dumps(world))
+
+def load(path, world=None):
+    with open(path, "rb") as f:
+        return loads(f.read(), world)
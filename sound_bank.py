@@ -0,0 +1,135 @@
+import hashlib
+import os
+import time
+import numpy as np
+import pygame
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".sound_cache")
+CACHE_VERSION = 1 # Bump when the synthesis code changes what a spec sounds like
+
+# --- Sound Specs ---
+class Tone:
+    """Parameters of one synthesized effect.
+
+    `waveform` is one of sine, square, saw, triangle or noise. The pitch
+    slides linearly from `freq` to `sweep_to` when that is given, `noise`
+    mixes in that fraction of white noise, and `attack_ms`/`release_ms`
+    fade the sound in and out.
+    """
+    def __init__(self, freq, duration_ms, waveform="sine", sweep_to=None, noise=0.0,
+                 attack_ms=0, release_ms=0, volume=0.1, seed=0):
+        self.freq = freq
+        self.duration_ms = duration_ms
+        self.waveform = waveform
+        self.sweep_to = sweep_to
+        self.noise = noise
+        self.attack_ms = attack_ms
+        self.release_ms = release_ms
+        self.volume = volume
+        self.seed = seed
+
+    def key(self):
+        # Volume is applied on playback, so it doesn't change the samples
+        return (self.freq, self.duration_ms, self.waveform, self.sweep_to, self.noise,
+                self.attack_ms, self.release_ms, self.seed)
+
+# --- Synthesis ---
+def synthesize(tone, sample_rate, bits):
+    """Renders a Tone to a mono int16 array at full scale for the mixer's sample size."""
+    max_amp = 2**(abs(bits) - 1) - 1
+    n = int(tone.duration_ms * sample_rate / 1000)
+    t = np.arange(n)
+
+    if tone.sweep_to is None:
+        cycles = tone.freq * t / sample_rate
+    else:
+        # Integrate the sliding frequency so the phase stays continuous
+        freq = np.linspace(tone.freq, tone.sweep_to, n)
+        cycles = np.concatenate([[0.0], np.cumsum(freq[:-1])]) / sample_rate
+
+    rng = np.random.default_rng(tone.seed)
+    if tone.waveform == "sine":
+        wave = np.sin(2 * np.pi * cycles)
+    elif tone.waveform == "square":
+        wave = np.where(cycles % 1 < 0.5, 1.0, -1.0)
+    elif tone.waveform == "saw":
+        wave = 2 * (cycles % 1) - 1
+    elif tone.waveform == "triangle":
+        wave = 1 - 4 * np.abs((cycles % 1) - 0.5)
+    elif tone.waveform == "noise":
+        wave = rng.uniform(-1, 1, n)
+    else:
+        raise ValueError(f"unknown waveform {tone.waveform!r}")
+
+    if tone.noise:
+        wave = (1 - tone.noise) * wave + tone.noise * rng.uniform(-1, 1, n)
+
+    envelope = np.ones(n)
+    attack = min(int(tone.attack_ms * sample_rate / 1000), n)
+    release = min(int(tone.release_ms * sample_rate / 1000), n)
+    if attack:
+        envelope[:attack] = np.linspace(0, 1, attack, endpoint=False)
+    if release:
+        envelope[n - release:] *= np.linspace(1, 0, release)
+
+    return (max_amp * wave * envelope).astype(np.int16)
+
+# --- Bank ---
+class SoundBank:
+    """Builds pygame Sounds from Tones, caching the samples on disk.
+
+    Samples are stored per (tone parameters, mixer format), so a later
+    launch with the same mixer settings loads them without synthesizing.
+    An unreadable or unwritable cache just means synthesizing again.
+    """
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.synthesized = 0
+        self.loaded = 0
+        self.seconds = 0.0 # Time spent in the last load()
+
+    def cache_path(self, tone, mixer_format):
+        digest = hashlib.sha1(repr((CACHE_VERSION, tone.key(), mixer_format)).encode()).hexdigest()
+        return os.path.join(self.cache_dir, digest[:16] + ".npy")
+
+    def samples(self, tone, mixer_format):
+        """Mono samples for a tone, from the cache when possible."""
+        sample_rate, bits, channels = mixer_format
+        path = self.cache_path(tone, mixer_format) if self.cache_dir else None
+        if path is not None:
+            try:
+                samples = np.load(path)
+                self.loaded += 1
+                return samples
+            except (OSError, ValueError):
+                pass
+
+        samples = synthesize(tone, sample_rate, bits)
+        self.synthesized += 1
+        if path is not None:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                # Write then rename so a crash never leaves a truncated file behind
+                tmp = f"{path}.{os.getpid()}.tmp"
+                with open(tmp, "wb") as f:
+                    np.save(f, samples)
+                os.replace(tmp, path)
+            except OSError:
+                pass
+        return samples
+
+    def make_sound(self, tone):
+        mixer_format = pygame.mixer.get_init()
+        mono = self.samples(tone, mixer_format)
+        channels = mixer_format[2]
+        buffer = mono if channels == 1 else np.repeat(mono[:, None], channels, axis=1)
+        sound = pygame.sndarray.make_sound(np.ascontiguousarray(buffer))
+        sound.set_volume(tone.volume)
+        return sound
+
+    def load(self, tones):
+        """Returns {name: Sound} for a {name: Tone} dict."""
+        start = time.perf_counter()
+        sounds = {name: self.make_sound(tone) for name, tone in tones.items()}
+        self.seconds = time.perf_counter() - start
+        return sounds
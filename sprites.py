@@ -0,0 +1,70 @@
+import pygame
+
+def display_format(surface):
+    """Returns `surface` converted to the display's pixel format.
+
+    Surfaces are returned unchanged while there is no display (e.g. a
+    headless World), so callers can use this unconditionally.
+    """
+    if pygame.display.get_surface() is None:
+        return surface
+    if surface.get_flags() & pygame.SRCALPHA:
+        return surface.convert_alpha()
+    alpha = surface.get_alpha()
+    converted = surface.convert()
+    if alpha is not None:
+        converted.set_alpha(alpha) # convert() drops the surface alpha
+    return converted
+
+class SpriteAtlas:
+    """Registry of shared sprite images, each built once on first use.
+
+    Images are registered as builder functions under a key; a builder gets
+    the atlas, so variants (flipped, tinted) can be derived from other
+    entries. Every sprite of a kind shares the same Surface, so spawning
+    costs no drawing. After `convert` (which needs a display mode) every
+    image, including ones built later, is in the display's pixel format.
+    """
+    def __init__(self):
+        self._builders = {}
+        self._images = {}
+        self.converted = False
+        self.builds = 0
+
+    def register(self, key, builder):
+        self._builders[key] = builder
+        self._images.pop(key, None)
+
+    def __getitem__(self, key):
+        image = self._images.get(key)
+        if image is None:
+            image = self._builders[key](self)
+            if self.converted:
+                image = display_format(image)
+            self._images[key] = image
+            self.builds += 1
+        return image
+
+    def __contains__(self, key):
+        return key in self._builders
+
+    def keys(self):
+        return self._builders.keys()
+
+    def convert(self):
+        """Builds every registered image and converts it to the display format."""
+        for key in self._builders:
+            self._images[key] = display_format(self[key])
+        self.converted = True
+
+    def flipped(self, key):
+        """A builder for `key` mirrored left to right."""
+        return lambda atlas: pygame.transform.flip(atlas[key], True, False)
+
+    def filled(self, key, color):
+        """A builder for a same-sized copy of `key` filled with one color."""
+        def build(atlas):
+            image = atlas[key].copy()
+            image.fill(color)
+            return image
+        return build
@@ -0,0 +1,111 @@
+import math
+import numpy as np
+import pygame
+
+TWINKLE_STEPS = 1024 # Resolution of the cached sine table
+
+class Starfield:
+    """A twinkling star background held in NumPy arrays.
+
+    Stars are grouped into parallax layers and kept sorted by x within each
+    layer, so finding the ones inside the camera window is two binary
+    searches. Brightness comes from a cached sine table and is computed for
+    visible stars only, in one vector op; the dots are then written straight
+    into the target's pixels. Layer 0 scrolls with the world like the
+    original stars; each further layer scrolls slower and wraps around.
+    """
+    def __init__(self, world_width, screen_width, screen_height, count=150, layers=1,
+                 parallax=0.5, rng=None):
+        rng = rng if rng is not None else np.random.default_rng()
+        self.world_width = world_width
+        self.screen_width = screen_width
+        self.layers = []
+        per_layer = [count // layers + (1 if i < count % layers else 0) for i in range(layers)]
+        speeds = []
+        offsets = []
+        first_row = 0
+        for depth, n in enumerate(per_layer):
+            x = rng.integers(0, world_width + 1, n).astype(np.float64)
+            y = rng.integers(50, screen_height - 100 + 1, n)
+            speed = rng.uniform(0.02, 0.05, n)
+            offset = rng.uniform(0, 2 * math.pi, n)
+            order = np.argsort(x, kind="stable")
+            self.layers.append({
+                "scroll": parallax ** depth, # Screen pixels moved per pixel of camera movement
+                "x": x[order],
+                "y": y[order],
+                "first_row": first_row,
+            })
+            speeds.append(speed[order])
+            offsets.append(offset[order])
+            first_row += n
+
+        # Twinkle phase is kept in table steps so a lookup replaces math.sin
+        steps_per_radian = TWINKLE_STEPS / (2 * math.pi)
+        self.phase_rate = np.concatenate(speeds) * steps_per_radian
+        self.phase_offset = np.concatenate(offsets) * steps_per_radian
+        wave = 128 + 127 * np.sin(np.arange(TWINKLE_STEPS) * 2 * math.pi / TWINKLE_STEPS)
+        self.twinkle = np.clip(wave.astype(np.int32), 50, 255)
+        self.drawn = (np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)) # Screen positions from the last draw
+
+    def __len__(self):
+        return len(self.phase_rate)
+
+    def visible(self, camera_x):
+        """Returns screen (xs, ys) and row numbers of every star in view."""
+        xs, ys, rows = [], [], []
+        for layer in self.layers:
+            left = camera_x * layer["scroll"]
+            windows = [left]
+            if layer["scroll"] != 1:
+                # Slower layers repeat across the world, so the view can straddle the seam
+                left %= self.world_width
+                windows = [left, left - self.world_width]
+            for start in windows:
+                # The original draws stars up to 5 px past either edge
+                lo = np.searchsorted(layer["x"], start - 5, side="left")
+                hi = np.searchsorted(layer["x"], start + self.screen_width + 5, side="right")
+                if hi > lo:
+                    xs.append(layer["x"][lo:hi] - start)
+                    ys.append(layer["y"][lo:hi])
+                    rows.append(np.arange(lo, hi) + layer["first_row"])
+        if not xs:
+            empty = np.empty(0, dtype=np.intp)
+            return empty, empty, empty
+        return np.concatenate(xs), np.concatenate(ys), np.concatenate(rows)
+
+    def brightness(self, rows, ticks):
+        """Twinkle brightness (50-255) of the given stars at `ticks` milliseconds."""
+        phase = (ticks * self.phase_rate[rows] + self.phase_offset[rows]).astype(np.int64)
+        return self.twinkle[phase % TWINKLE_STEPS]
+
+    def draw(self, surface, camera_x, ticks=None):
+        if ticks is None:
+            ticks = pygame.time.get_ticks()
+        xs, ys, rows = self.visible(camera_x)
+        if not len(rows):
+            self.drawn = (xs, ys)
+            return
+        level = self.brightness(rows, ticks)
+        xs = xs.astype(np.intp)
+        ys = ys.astype(np.intp)
+        self.drawn = (xs, ys)
+
+        if surface.get_bytesize() != 4 or set(surface.get_masks()[:3]) != {0xFF0000, 0xFF00, 0xFF}:
+            # Unusual pixel format: fall back to one fill per star
+            for x, y, c in zip(xs.tolist(), ys.tolist(), level.tolist()):
+                surface.fill((c, c, c), (x - 1, y - 1, 2, 2))
+            return
+
+        # Grey has the same value in every channel, so channel order doesn't matter
+        color = level * 0x010101 | surface.get_masks()[3]
+        width, height = surface.get_size()
+        pixels = pygame.surfarray.pixels2d(surface)
+        # Same 2x2 dot that pygame.draw.circle(..., radius=1) produces
+        for dx in (-1, 0):
+            for dy in (-1, 0):
+                px = xs + dx
+                py = ys + dy
+                inside = (px >= 0) & (px < width) & (py >= 0) & (py < height)
+                pixels[px[inside], py[inside]] = color[inside]
+        del pixels # Unlock the surface
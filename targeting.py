@@ -0,0 +1,121 @@
+import numpy as np
+
+SORT_PAIRS = 16384 # Up to this many seeker x candidate pairs, exclusive picks sort them all at once
+
+class TargetingService:
+    """Picks the nearest humanoid for every Lander that needs a target, once per frame.
+
+    All seekers are matched against all candidates with one distance matrix
+    (built in row chunks so huge waves don't allocate huge temporaries),
+    instead of each Lander scanning the humanoid list on its own. With
+    `exclusive` set, no humanoid is handed to more than one Lander: pairs are
+    granted closest-first and humanoids already being chased are skipped.
+    Past SORT_PAIRS pairs that path builds no matrix at all: it walks
+    nearest-neighbour links one vector pass at a time (`grant_chained`), so
+    it needs memory for one row and about three passes per granted pair.
+    """
+    def __init__(self, exclusive=False, chunk_size=1024):
+        self.exclusive = exclusive
+        self.chunk_size = chunk_size
+
+    def assign(self, seeker_xs, seeker_ys, target_xs, target_ys, taken=None):
+        """Returns, for each seeker, the index of its target or -1 if none is free.
+
+        `taken` optionally marks targets that are already claimed; it is only
+        honoured in exclusive mode.
+        """
+        seeker_xs = np.asarray(seeker_xs, dtype=np.float64)
+        seeker_ys = np.asarray(seeker_ys, dtype=np.float64)
+        target_xs = np.asarray(target_xs, dtype=np.float64)
+        target_ys = np.asarray(target_ys, dtype=np.float64)
+        result = np.full(len(seeker_xs), -1, dtype=np.intp)
+        if not len(seeker_xs) or not len(target_xs):
+            return result
+
+        if not self.exclusive:
+            # Squared distance keeps the same ordering as math.hypot
+            for start in range(0, len(seeker_xs), self.chunk_size):
+                stop = start + self.chunk_size
+                dx = target_xs[None, :] - seeker_xs[start:stop, None]
+                dy = target_ys[None, :] - seeker_ys[start:stop, None]
+                result[start:stop] = np.argmin(dx * dx + dy * dy, axis=1)
+            return result
+
+        free = np.ones(len(target_xs), dtype=bool) if taken is None else ~np.asarray(taken, dtype=bool)
+        candidates = np.flatnonzero(free)
+        if not len(candidates):
+            return result
+        cand_xs = target_xs[candidates]
+        cand_ys = target_ys[candidates]
+        if len(seeker_xs) * len(candidates) <= SORT_PAIRS:
+            picks = self.grant_sorted(seeker_xs, seeker_ys, cand_xs, cand_ys)
+        else:
+            picks = self.grant_chained(seeker_xs, seeker_ys, cand_xs, cand_ys)
+        granted = picks >= 0
+        result[granted] = candidates[picks[granted]]
+        return result
+
+    def grant_sorted(self, seeker_xs, seeker_ys, xs, ys):
+        """Exclusive picks for a small problem: every pair sorted at once, then granted closest-first."""
+        dx = xs[None, :] - seeker_xs[:, None]
+        dy = ys[None, :] - seeker_ys[:, None]
+        distances = (dx * dx + dy * dy).ravel()
+        n, m = dx.shape
+        seekers = np.repeat(np.arange(n), m)
+        targets = np.tile(np.arange(m), n)
+        # Closest first; ties go to the lower seeker, then the lower candidate
+        order = np.lexsort((targets, seekers, distances))
+        picks = np.full(n, -1, dtype=np.intp)
+        claimed = np.zeros(m, dtype=bool)
+        remaining = min(n, m)
+        for s, t in zip(seekers[order].tolist(), targets[order].tolist()):
+            if picks[s] >= 0 or claimed[t]:
+                continue
+            picks[s] = t
+            claimed[t] = True
+            remaining -= 1
+            if not remaining:
+                break
+        return picks
+
+    def grant_chained(self, seeker_xs, seeker_ys, xs, ys):
+        """The same picks as grant_sorted, found without building the pair matrix.
+
+        Follows nearest-neighbour links: a seeker to its nearest free
+        candidate, that candidate to its nearest unserved seeker, and so on
+        until two point at each other. No other pair can beat that one, so it
+        is granted and the chain carries on from the element before it.
+        """
+        n, m = len(seeker_xs), len(xs)
+        picks = np.full(n, -1, dtype=np.intp)
+        served = np.zeros(n, dtype=bool)
+        claimed = np.zeros(m, dtype=bool)
+        remaining = min(n, m)
+        chain = [] # Seekers at even positions, candidates at odd ones
+        start = 0
+        while remaining:
+            if not chain:
+                while served[start]:
+                    start += 1
+                chain.append(start)
+            top = chain[-1]
+            from_seeker = len(chain) % 2 == 1
+            if from_seeker:
+                dx = xs - seeker_xs[top]
+                dy = ys - seeker_ys[top]
+            else:
+                dx = xs[top] - seeker_xs
+                dy = ys[top] - seeker_ys
+            d2 = dx * dx + dy * dy
+            d2[claimed if from_seeker else served] = np.inf
+            nearest = int(np.argmin(d2)) # The lowest index among ties
+            if len(chain) > 1 and nearest == chain[-2]:
+                del chain[-2:]
+                seeker, candidate = (top, nearest) if from_seeker else (nearest, top)
+                served[seeker] = True
+                claimed[candidate] = True
+                picks[seeker] = candidate
+                remaining -= 1
+            else:
+                chain.append(nearest)
+        return picks
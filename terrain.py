@@ -0,0 +1,97 @@
+import bisect
+import random
+import numpy as np
+
+class Terrain:
+    """The planet surface as a polyline of (x, y) points sorted by x.
+
+    Heights are looked up by computing the segment index directly when the
+    points sit on a uniform grid (the usual case), or with a binary search
+    when they do not, so a lookup costs the same however wide the world is.
+    Outside the covered range the lookup returns `fallback`.
+    """
+    def __init__(self, points, fallback):
+        self.points = [(x, y) for x, y in points]
+        self.fallback = fallback
+        self._px = [p[0] for p in self.points]
+        self._py = [p[1] for p in self.points]
+        self.xs = np.array(self._px, dtype=np.float64)
+        self.ys = np.array(self._py, dtype=np.float64)
+        self.min_x = self._px[0]
+        self.max_x = self._px[-1]
+        self.listeners = [] # Called with (x_min, x_max) whenever heights change
+
+        # A uniform grid lets us skip the search entirely
+        steps = np.diff(self.xs)
+        if len(steps) and np.all(steps == steps[0]) and steps[0] > 0:
+            self.spacing = float(steps[0])
+        else:
+            self.spacing = None
+
+    @classmethod
+    def generate(cls, width, base_y, spacing=60, jitter=25, rng=random):
+        """Builds a random ridge line covering [0, width] on a uniform grid."""
+        points = []
+        for x in range(0, width + spacing, spacing): # Ensure it covers the whole world
+            y = base_y + rng.randint(-jitter, jitter)
+            points.append((x, y))
+        return cls(points, fallback=base_y)
+
+    def height_at(self, x):
+        """Calculates the y-coordinate of the terrain at a given x-coordinate."""
+        if not (self.min_x <= x < self.max_x):
+            return self.fallback # Fallback for edges
+        if self.spacing is not None:
+            i = min(int((x - self.min_x) // self.spacing), len(self._px) - 2)
+        else:
+            i = bisect.bisect_right(self._px, x) - 1
+        px = self._px
+        py = self._py
+        # Linear interpolation to find the exact height
+        return py[i] + (x - px[i]) * (py[i+1] - py[i]) / (px[i+1] - px[i])
+
+    def segment_indices(self, xs):
+        """Vectorized segment lookup: i with points[i].x <= x < points[i+1].x, clamped to the end segments."""
+        last = len(self._px) - 2
+        if self.spacing is not None:
+            i = np.floor_divide(xs - self.min_x, self.spacing) # Rounds like height_at's //
+            return np.clip(np.nan_to_num(i), 0, last).astype(np.intp)
+        return np.clip(np.searchsorted(self.xs, xs, side="right") - 1, 0, last)
+
+    def heights_at(self, xs, ys=None):
+        """Vectorized height_at for an array of x-coordinates.
+
+        `ys` optionally replaces the point heights with one row of heights
+        per row of `xs`, for many terrains on the same x points (WorldBatch).
+        """
+        xs = np.asarray(xs, dtype=np.float64)
+        i = self.segment_indices(xs)
+        if ys is None:
+            y1 = self.ys[i]
+            y2 = self.ys[i + 1]
+        else:
+            rows = np.arange(len(ys)).reshape((-1,) + (1,) * (xs.ndim - 1))
+            y1 = ys[rows, i]
+            y2 = ys[rows, i + 1]
+        x1 = self.xs[i]
+        heights = y1 + (xs - x1) * (y2 - y1) / (self.xs[i + 1] - x1)
+        return np.where((xs >= self.min_x) & (xs < self.max_x), heights, self.fallback)
+
+    def set_heights(self, indices, heights):
+        """Moves the given points to new heights (e.g. when the planet is destroyed).
+
+        Listeners are told which x-range of the surface changed so caches
+        can rebuild only that part.
+        """
+        indices = list(indices)
+        if not indices:
+            return
+        for i, y in zip(indices, heights):
+            self._py[i] = y
+            self.ys[i] = y
+            self.points[i] = (self._px[i], y)
+        # Moving a point reshapes the segments on both sides of it
+        x_min = self._px[max(min(indices) - 1, 0)]
+        x_max = self._px[min(max(indices) + 1, len(self._px) - 1)]
+        for listener in self.listeners:
+            listener(x_min, x_max)
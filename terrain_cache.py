@@ -0,0 +1,78 @@
+import math
+import pygame
+
+from sprites import display_format
+
+class TerrainCache:
+    """The terrain rasterized once into world-space tiles and scrolled by blitting.
+
+    The ground line is static, so instead of drawing every segment each
+    frame it is drawn once into tiles at least a screen wide; a frame is
+    then one or two partial blits keyed by camera_x. Tiles repeat every
+    `world_width` pixels so a camera crossing the seam stays seamless. When
+    the Terrain reports a height change only the tiles it touches are marked
+    dirty and redrawn on the next draw.
+    """
+    def __init__(self, terrain, world_width, color, line_width=2, tile_width=1024):
+        self.terrain = terrain
+        self.world_width = world_width
+        self.color = color
+        self.line_width = line_width
+        self.tile_width = tile_width
+        self.tile_count = math.ceil(world_width / tile_width)
+        self.rebuilds = 0 # Tiles rasterized so far
+        self.tiles = [None] * self.tile_count
+        self._measure_band()
+        terrain.listeners.append(self.invalidate)
+
+    def _measure_band(self):
+        # Leave room for the line width, and for modest edits without resizing
+        margin = self.line_width + 2
+        self.band_top = int(math.floor(self.terrain.ys.min())) - margin
+        self.band_bottom = int(math.ceil(self.terrain.ys.max())) + margin
+
+    def invalidate(self, x_min=None, x_max=None):
+        """Marks the tiles covering [x_min, x_max] (default: everything) for redrawing."""
+        ys = self.terrain.ys
+        if x_min is None or ys.min() - self.line_width < self.band_top or ys.max() + self.line_width > self.band_bottom:
+            self._measure_band()
+            self.tiles = [None] * self.tile_count
+            return
+        first = int((x_min - self.line_width) // self.tile_width)
+        last = int((x_max + self.line_width) // self.tile_width)
+        for i in range(first, last + 1):
+            self.tiles[min(i % self.tile_count, self.tile_count - 1)] = None
+
+    def _rasterize(self, index):
+        x0 = index * self.tile_width
+        tile = display_format(pygame.Surface((self.tile_width, self.band_bottom - self.band_top)))
+        tile.fill((0, 0, 0))
+        points = self.terrain.points
+        pad = self.line_width
+        for i in range(len(points) - 1):
+            (x1, y1), (x2, y2) = points[i], points[i + 1]
+            if max(x1, x2) < x0 - pad or min(x1, x2) > x0 + self.tile_width + pad:
+                continue
+            pygame.draw.line(tile, self.color, (x1 - x0, y1 - self.band_top), (x2 - x0, y2 - self.band_top), self.line_width)
+        tile.set_colorkey((0, 0, 0), pygame.RLEACCEL) # Only the line covers what is behind it
+        self.tiles[index] = tile
+        self.rebuilds += 1
+        return tile
+
+    def draw(self, surface, camera_x):
+        left = int(camera_x)
+        right = left + surface.get_width()
+        height = self.band_bottom - self.band_top
+        x = left
+        while x < right:
+            # Position within the repeating world, then the tile holding it
+            period = (x // self.world_width) * self.world_width
+            index = min((x - period) // self.tile_width, self.tile_count - 1)
+            tile = self.tiles[index]
+            if tile is None:
+                tile = self._rasterize(index)
+            tile_x = period + index * self.tile_width
+            stop = min(right, tile_x + self.tile_width, period + self.world_width)
+            # Only the part of the tile inside the view is copied
+            surface.blit(tile, (x - left, self.band_top), (x - tile_x, 0, stop - x, height))
+            x = stop
@@ -0,0 +1,49 @@
+"""Sprite mode and entity-store mode must play out identically.
+
+    python -m pytest -q test_entity_store.py
+"""
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+import random
+import pytest
+
+from simulation import World, Inputs, Lander
+
+def game_state(world):
+    """Everything that affects play, in group order, with no mode-specific types."""
+    player = world.player
+    humanoids = [(h.uid, h.world_x, h.world_y, h.is_abducted, h.is_falling, h.is_carried, h.is_dead)
+                 for h in world.humanoids]
+    enemies = []
+    for e in world.enemies:
+        if isinstance(e, Lander):
+            target = e.target_humanoid
+            enemies.append(("lander", e.world_x, e.world_y, e.velocity_x, e.velocity_y,
+                            e.has_humanoid, None if target is None else target.uid))
+        else:
+            enemies.append(("mutant", e.world_x, e.world_y))
+    lasers = [(l.world_x, l.world_y, l.speed_x) for l in world.lasers]
+    return ((player.world_x, player.world_y, player.lives, player.bombs, world.score, world.game_over),
+            humanoids, enemies, lasers)
+
+def random_inputs(seed, frames):
+    rng = random.Random(seed)
+    for _ in range(frames):
+        mask = rng.getrandbits(6)
+        yield Inputs(*(bool(mask >> bit & 1) for bit in range(6)))
+
+@pytest.mark.parametrize("options", [
+    dict(),
+    dict(num_landers=200, num_humanoids=5), # Contested grabs every few frames
+    dict(num_landers=60, num_humanoids=30, exclusive_targets=True),
+    dict(waves=True),
+])
+@pytest.mark.parametrize("seed", [0, 1, 7])
+def test_store_matches_sprites(options, seed):
+    sprites = World(seed=seed, **options)
+    stored = World(seed=seed, use_entity_store=True, **options)
+    for frame, inputs in enumerate(random_inputs(seed, 600), 1):
+        sprites.step(inputs)
+        stored.step(inputs)
+        assert game_state(stored) == game_state(sprites), f"diverged at frame {frame}"
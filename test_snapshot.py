@@ -0,0 +1,55 @@
+"""A restored snapshot plays on exactly like the game it was taken from.
+
+    python -m pytest -q test_snapshot.py
+"""
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+import random
+import pytest
+
+import snapshot
+from replay import state_hash
+from simulation import World, Inputs
+
+def random_inputs(rng, frames):
+    return [Inputs(left=rng.random() < 0.3, right=rng.random() < 0.4, up=rng.random() < 0.2,
+                   down=rng.random() < 0.2, fire=rng.random() < 0.2, bomb=rng.random() < 0.003)
+            for _ in range(frames)]
+
+def play(world, inputs):
+    for step in inputs:
+        world.step(step)
+    return state_hash(world)
+
+@pytest.mark.parametrize("options", [
+    dict(),
+    dict(use_entity_store=True, num_landers=40),
+    dict(ai_lod=True, num_landers=40),
+    dict(waves=True, exclusive_targets=True),
+])
+def test_round_trip(tmp_path, options):
+    rng = random.Random(3)
+    world = World(seed=3, **options)
+    play(world, random_inputs(rng, 600))
+    data = snapshot.dumps(world)
+    path = tmp_path / "game.dfs"
+    snapshot.save(world, path)
+    fork = snapshot.load(path)
+    assert state_hash(fork) == state_hash(world)
+    assert snapshot.dumps(fork) == data
+
+    later = random_inputs(rng, 900)
+    expected = play(world, later)
+    assert play(fork, later) == expected
+    snapshot.loads(data, world) # Rewind in place
+    assert play(world, later) == expected
+
+def test_rejects_other_settings():
+    data = snapshot.dumps(World(seed=1, use_entity_store=True))
+    with pytest.raises(ValueError):
+        snapshot.loads(data, World(seed=1))
+
+def test_rejects_garbage():
+    with pytest.raises(ValueError):
+        snapshot.loads(b"DFSS" + bytes(10))
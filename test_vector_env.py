@@ -0,0 +1,51 @@
+"""WorldBatch must play the same games as sprite-mode Worlds.
+
+    python -m pytest -q test_vector_env.py
+"""
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+import numpy as np
+import pytest
+
+from replay import unpack_inputs
+from simulation import World, Mutant
+from vector_env import WorldBatch
+
+GAMES = 8
+
+def world_state(world):
+    player = world.player
+    enemies = [(isinstance(e, Mutant), e.world_x, e.world_y) for e in world.enemies]
+    humanoids = [(h.world_x, h.world_y, h.is_falling, h.is_abducted) for h in world.humanoids]
+    lasers = sorted((l.world_x, l.world_y) for l in world.lasers)
+    return ((world.score, player.lives, player.bombs, player.world_x, player.world_y, world.camera_x,
+             world.game_over), enemies, humanoids, lasers)
+
+def batch_state(batch, i):
+    enemies = [(bool(batch.mutant[i, s]), batch.ex[i, s], batch.ey[i, s])
+               for s in np.flatnonzero(batch.e_alive[i]).tolist()]
+    humanoids = [(batch.hx[i, s], batch.hy[i, s], bool(batch.falling[i, s]), bool(batch.abducted[i, s]))
+                 for s in np.flatnonzero(batch.h_alive[i]).tolist()]
+    lasers = sorted((batch.lx[i, s], batch.ly[i, s]) for s in np.flatnonzero(batch.l_alive[i]).tolist())
+    return ((int(batch.score[i]), int(batch.lives[i]), int(batch.bombs[i]), batch.px[i], batch.py[i],
+             batch.camera_x[i], bool(batch.game_over[i])), enemies, humanoids, lasers)
+
+@pytest.mark.parametrize("options", [dict(), dict(num_landers=20, num_humanoids=15)])
+def test_batch_matches_worlds(options):
+    batch = WorldBatch(GAMES, **options)
+    worlds = []
+    for i in range(GAMES):
+        batch.reset(i, 100 + i)
+        worlds.append(World(seed=100 + i, **options))
+    rng = np.random.default_rng(0)
+    # Fire often and bomb now and then, so every rule gets exercised
+    press = np.array([0.3, 0.35, 0.3, 0.3, 0.3, 0.004])
+    for frame in range(1, 1501):
+        actions = (rng.random((GAMES, 6)) < press) @ (1 << np.arange(6))
+        batch.step(actions)
+        for i, world in enumerate(worlds):
+            if world.game_over:
+                continue
+            world.step(unpack_inputs(int(actions[i])))
+            assert batch_state(batch, i) == world_state(world), f"game {i} diverged at frame {frame}"
@@ -0,0 +1,44 @@
+import time
+
+from simulation import FPS
+
+class FixedStep:
+    """Accumulator that turns wall-clock time into fixed simulation ticks.
+
+    Call `advance` once per rendered frame. It returns how many ticks of
+    1 / FPS seconds are due (every speed in the World is per tick, so the
+    rate is not adjustable), and `alpha` then tells how far the
+    leftover time reaches towards the next tick (0-1), for interpolating
+    the drawn positions. A frame never runs more than `max_steps` ticks;
+    time beyond that is dropped (counted in `dropped`) so one slow frame
+    can't snowball into ever longer catch-up frames.
+    """
+    def __init__(self, max_steps=5, time_source=time.perf_counter):
+        self.dt = 1 / FPS
+        self.max_steps = max_steps
+        self.time_source = time_source
+        self.accumulator = 0.0
+        self.last_time = None
+        self.ticks = 0
+        self.dropped = 0 # Ticks skipped by the catch-up cap
+
+    def advance(self):
+        now = self.time_source()
+        if self.last_time is None:
+            elapsed = self.dt # Run one tick straight away on the first frame
+        else:
+            elapsed = now - self.last_time
+        self.last_time = now
+        self.accumulator += elapsed
+
+        steps = int(self.accumulator // self.dt)
+        self.accumulator -= steps * self.dt
+        if steps > self.max_steps:
+            self.dropped += steps - self.max_steps
+            steps = self.max_steps
+        self.ticks += steps
+        return steps
+
+    @property
+    def alpha(self):
+        return min(self.accumulator / self.dt, 1.0)
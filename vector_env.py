@@ -0,0 +1,715 @@
+"""Many games stepped in lock-step as arrays, for training agents.
+
+    env = VectorDefenderEnv(256, seed=0)
+    obs, infos = env.reset()
+    obs, rewards, terminated, truncated, infos = env.step(actions)
+
+`WorldBatch` keeps N games as NumPy arrays with one row per game and plays
+the same rules as World.step (sprite mode) on all of them at once: player
+physics, humanoid falls, lander targeting, pursuit and abduction, mutant
+homing, laser and player collisions, catching, smart bombs and spawning.
+Each game starts from a real World built from its seed and spawns new
+landers from that World's random generator, so an episode can be watched
+again with World(seed=...) and the same inputs. Explosions are cosmetic and
+are left out.
+
+VectorDefenderEnv wraps a batch in the Gym vector API: actions are input
+bitmasks (replay.BUTTONS, 0-63), rewards are score deltas and a game ends
+when the player runs out of lives or every humanoid is gone. Finished
+games are reset straight away; their last observation is in
+infos["final_observation"].
+"""
+import numpy as np
+
+from entity_store import hypot
+from replay import LEFT, RIGHT, UP, DOWN, FIRE, BOMB
+from simulation import (
+    SCREEN_WIDTH, SCREEN_HEIGHT, WORLD_WIDTH, PLAYABLE_HEIGHT, FALL_DAMAGE_DISTANCE, CATCH_DISTANCE,
+    SPRITES, Mutant, World,
+)
+from terrain import Terrain
+
+NUM_ACTIONS = 64 # Every combination of the six buttons
+NEAREST_ENEMIES = 8
+NEAREST_HUMANOIDS = 4
+PLAYER_FEATURES = 10
+ENEMY_FEATURES = 5 # dx, dy, is mutant, carrying, present
+HUMANOID_FEATURES = 5 # dx, dy, falling, abducted, present
+OBSERVATION_SIZE = PLAYER_FEATURES + NEAREST_ENEMIES * ENEMY_FEATURES + NEAREST_HUMANOIDS * HUMANOID_FEATURES
+
+# Scanner observations: counts of the player, enemies and humanoids per cell
+# of a coarse grid over the whole world
+SCAN_CHANNELS = 3
+SCAN_ROWS = 16
+SCAN_COLUMNS = 64
+OBSERVATION_SHAPES = {
+    "features": (OBSERVATION_SIZE,),
+    "scanner": (SCAN_CHANNELS, SCAN_ROWS, SCAN_COLUMNS),
+}
+
+def half_size(key):
+    width, height = SPRITES[key].get_size()
+    return width / 2, height / 2
+
+class WorldBatch:
+    """N independent games held as arrays and stepped together.
+
+    Humanoids keep their slot for the whole game. Enemies are appended in
+    spawn order and compacted after every step, so slot order is the order
+    World keeps its enemies group in, which decides who wins a contested
+    abduction and which enemy a laser hits first. Lasers can go in any free
+    slot. Tables grow when a game runs out of room.
+    """
+    def __init__(self, n, width=WORLD_WIDTH, num_humanoids=10, num_landers=6):
+        self.n = n
+        self.width = width
+        self.num_humanoids = num_humanoids
+        self.num_landers = num_landers
+        self.rows = np.arange(n)
+        self.rngs = [None] * n
+        self.seeds = np.zeros(n, dtype=np.int64)
+
+        self.player_half = half_size("player")
+        self.laser_half = half_size("laser")
+        self.lander_half = half_size("lander")
+        self.mutant_half = half_size("mutant")
+
+        # Per game
+        self.frame = np.zeros(n, dtype=np.int64)
+        self.score = np.zeros(n, dtype=np.int64)
+        self.game_over = np.zeros(n, dtype=bool)
+        self.camera_x = np.zeros(n)
+
+        # Player
+        self.px = np.zeros(n)
+        self.py = np.zeros(n)
+        self.pvx = np.zeros(n)
+        self.pvy = np.zeros(n)
+        self.lives = np.zeros(n, dtype=np.int64)
+        self.bombs = np.zeros(n, dtype=np.int64)
+        self.facing_right = np.ones(n, dtype=bool)
+        self.invincible = np.zeros(n, dtype=bool)
+        self.invincible_timer = np.zeros(n, dtype=np.int64)
+        self.carried = np.full(n, -1, dtype=np.int64) # Humanoid slot the player holds
+
+        # Terrain: every game has its own heights on the x points of the first
+        # World loaded (all are generated on the same grid for one width)
+        self.terrain = None
+        self.terrain_ys = None
+
+        # Humanoids
+        shape = (n, num_humanoids)
+        self.hx = np.zeros(shape)
+        self.hy = np.zeros(shape)
+        self.hvy = np.zeros(shape)
+        self.fall_start_y = np.zeros(shape)
+        self.h_alive = np.zeros(shape, dtype=bool)
+        self.abducted = np.zeros(shape, dtype=bool)
+        self.falling = np.zeros(shape, dtype=bool)
+        self.h_carried = np.zeros(shape, dtype=bool)
+        self.dead = np.zeros(shape, dtype=bool)
+        self.death_timer = np.zeros(shape, dtype=np.int64)
+
+        # Enemies (landers and mutants, in spawn order)
+        self.enemy_count = np.zeros(n, dtype=np.int64) # Slots in use, including ones killed this step
+        self.enemy_fields = {
+            "ex": np.float64, "ey": np.float64, "evx": np.float64, "evy": np.float64,
+            "e_alive": bool, "mutant": bool, "target": np.int64, "has_humanoid": bool,
+        }
+        self.laser_fields = {"lx": np.float64, "ly": np.float64, "lspeed": np.float64, "l_alive": bool}
+        self._allocate(self.enemy_fields, num_landers + 8)
+        self._allocate(self.laser_fields, 16)
+
+    def _allocate(self, fields, capacity):
+        for name, dtype in fields.items():
+            setattr(self, name, np.zeros((self.n, capacity), dtype=dtype))
+        self.target[:] = -1
+
+    def _grow(self, fields, capacity):
+        for name, dtype in fields.items():
+            old = getattr(self, name)
+            if old.shape[1] >= capacity:
+                return
+            grown = np.zeros((self.n, capacity), dtype=dtype)
+            if name == "target":
+                grown[:] = -1
+            grown[:, :old.shape[1]] = old
+            setattr(self, name, grown)
+
+    # --- Reset ---
+    def reset(self, i, seed):
+        """Starts game `i` afresh from World(seed=seed)."""
+        world = World(width=self.width, num_humanoids=self.num_humanoids, num_landers=self.num_landers, seed=seed)
+        self.load_world(i, world)
+        self.seeds[i] = seed
+
+    def load_world(self, i, world):
+        """Copies a (sprite mode) World into row `i`."""
+        self.rngs[i] = world.rng
+        self.frame[i] = world.frame
+        self.score[i] = world.score
+        self.game_over[i] = world.game_over
+        self.camera_x[i] = world.camera_x
+        if self.terrain is None:
+            self.terrain = Terrain(world.terrain.points, world.terrain.fallback)
+            self.terrain_ys = np.zeros((self.n, len(self.terrain.ys)))
+        self.terrain_ys[i] = world.terrain.ys
+
+        p = world.player
+        self.px[i] = p.world_x
+        self.py[i] = p.world_y
+        self.pvx[i] = p.velocity_x
+        self.pvy[i] = p.velocity_y
+        self.lives[i] = p.lives
+        self.bombs[i] = p.bombs
+        self.facing_right[i] = p.facing_right
+        self.invincible[i] = p.invincible
+        self.invincible_timer[i] = p.invincible_timer
+
+        humanoids = world.humanoids.sprites()
+        slot_of = {h: s for s, h in enumerate(humanoids)}
+        self.carried[i] = slot_of.get(p.carried_humanoid, -1)
+        self.h_alive[i] = False
+        for s, h in enumerate(humanoids):
+            self.hx[i, s] = h.world_x
+            self.hy[i, s] = h.world_y
+            self.hvy[i, s] = h.velocity_y
+            self.fall_start_y[i, s] = h.fall_start_y
+            self.h_alive[i, s] = True
+            self.abducted[i, s] = h.is_abducted
+            self.falling[i, s] = h.is_falling
+            self.h_carried[i, s] = h.is_carried
+            self.dead[i, s] = h.is_dead
+            self.death_timer[i, s] = h.death_timer
+
+        enemies = world.enemies.sprites()
+        self._grow(self.enemy_fields, len(enemies))
+        for name in self.enemy_fields:
+            getattr(self, name)[i] = 0
+        self.target[i] = -1
+        for s, e in enumerate(enemies):
+            self.ex[i, s] = e.world_x
+            self.ey[i, s] = e.world_y
+            self.e_alive[i, s] = True
+            self.mutant[i, s] = isinstance(e, Mutant)
+            if not isinstance(e, Mutant):
+                self.evx[i, s] = e.velocity_x
+                self.evy[i, s] = e.velocity_y
+                self.target[i, s] = slot_of.get(e.target_humanoid, -1)
+                self.has_humanoid[i, s] = e.has_humanoid
+        self.enemy_count[i] = len(enemies)
+
+        self.l_alive[i] = False
+        lasers = world.lasers.sprites()
+        self._grow(self.laser_fields, len(lasers))
+        for s, l in enumerate(lasers):
+            self.lx[i, s] = l.world_x
+            self.ly[i, s] = l.world_y
+            self.lspeed[i, s] = l.speed_x
+            self.l_alive[i, s] = True
+
+    # --- Queries ---
+    def heights_at(self, xs):
+        """Terrain height under each x; `xs` has one row per game."""
+        return self.terrain.heights_at(xs, self.terrain_ys)
+
+    def wrapped_dx(self, a, b):
+        """The x distance from b to a the short way round the world."""
+        w = self.width
+        return (a - b + w / 2) % w - w / 2
+
+    def box_dx(self, a, b):
+        # The collision index works on positions already wrapped into the world
+        w = self.width
+        return np.abs((np.mod(a, w) - np.mod(b, w) + w / 2) % w - w / 2)
+
+    # --- Frame ---
+    def step(self, actions):
+        """Advances every game by one frame. `actions` holds one input bitmask per game.
+
+        A game that is over keeps playing until it is reset.
+        """
+        actions = np.asarray(actions)
+        fire = (actions & FIRE) != 0
+        bomb = ((actions & BOMB) != 0) & (self.bombs > 0)
+        if fire.any():
+            self.shoot(fire)
+        if bomb.any():
+            self.detonate_smart_bombs(bomb)
+
+        self.frame += 1
+        self.assign_lander_targets()
+        self.update_player((actions & LEFT) != 0, (actions & RIGHT) != 0, (actions & UP) != 0, (actions & DOWN) != 0)
+        self.update_humanoids()
+        self.update_mutants() # Before the landers, so mutants spawned this frame wait a frame
+        self.update_landers()
+        self.update_lasers()
+        self.update_camera()
+        self.collide_lasers()
+        self.collide_player()
+        self.catch_humanoids()
+        self.spawn_landers()
+        self.compact_enemies()
+        self.game_over |= ~self.h_alive.any(axis=1)
+
+    def shoot(self, firing):
+        games = np.flatnonzero(firing)
+        free = ~self.l_alive[games]
+        if not free.any(axis=1).all():
+            self._grow(self.laser_fields, self.l_alive.shape[1] * 2)
+            free = ~self.l_alive[games]
+        slots = np.argmax(free, axis=1)
+        self.lx[games, slots] = self.px[games]
+        self.ly[games, slots] = self.py[games]
+        self.lspeed[games, slots] = np.where(self.facing_right[games], 15.0, -15.0)
+        self.l_alive[games, slots] = True
+
+    def release(self, games, slots):
+        """Drops the humanoids that the given landers were carrying."""
+        targets = self.target[games, slots]
+        self.abducted[games, targets] = False
+        self.falling[games, targets] = True
+        self.fall_start_y[games, targets] = self.hy[games, targets]
+
+    def detonate_smart_bombs(self, bombing):
+        self.bombs -= bombing
+        cam = self.camera_x[:, None]
+        blast = bombing[:, None] & self.e_alive & (cam - 50 < self.ex) & (self.ex < cam + SCREEN_WIDTH + 50)
+        games, slots = np.nonzero(blast & ~self.mutant & self.has_humanoid & (self.target >= 0))
+        self.release(games, slots)
+        self.e_alive &= ~blast
+        self.score += 100 * blast.sum(axis=1)
+
+    def assign_lander_targets(self):
+        """Every lander without a live, unclaimed target takes its nearest free humanoid."""
+        rows = self.rows[:, None]
+        landers = self.e_alive & ~self.mutant
+        target = np.maximum(self.target, 0)
+        valid = (self.target >= 0) & self.h_alive[rows, target] & ~self.abducted[rows, target]
+        seeking = landers & ~self.has_humanoid & ~valid
+        self.target[seeking] = -1
+        games, slots = np.nonzero(seeking)
+        if not len(games):
+            return
+        available = self.h_alive & ~self.abducted
+        dx = self.hx[games] - self.ex[games, slots][:, None]
+        dy = self.hy[games] - self.ey[games, slots][:, None]
+        d2 = np.where(available[games], dx * dx + dy * dy, np.inf)
+        found = available[games].any(axis=1)
+        self.target[games[found], slots[found]] = np.argmin(d2[found], axis=1)
+
+    def update_player(self, left, right, up, down):
+        # Handle invincibility
+        ticking = self.invincible
+        self.invincible_timer -= ticking
+        self.invincible &= ~(ticking & (self.invincible_timer <= 0))
+
+        acceleration = 0.8
+        max_speed = 8
+        friction = 0.97
+        self.pvx = np.where(left, self.pvx - acceleration, self.pvx)
+        self.facing_right &= ~left
+        self.pvx = np.where(right, self.pvx + acceleration, self.pvx)
+        self.facing_right |= right
+        self.pvy = np.where(up, self.pvy - acceleration, self.pvy)
+        self.pvy = np.where(down, self.pvy + acceleration, self.pvy)
+        self.pvx = np.clip(self.pvx * friction, -max_speed, max_speed)
+        self.pvy = np.clip(self.pvy * friction, -max_speed, max_speed)
+        self.px += self.pvx
+        self.py += self.pvy
+
+        # World wrapping for X
+        self.px[self.px < 0] = self.width
+        self.px[self.px > self.width] = 0
+
+        ground = self.heights_at(self.px)
+        top = self.py < 60
+        self.py[top] = 60
+        self.pvy[top] = 0
+        low = self.py > ground - 10
+        self.py[low] = ground[low] - 10
+        self.pvy[low] = 0
+
+    def update_humanoids(self):
+        alive = self.h_alive
+        carried = alive & self.h_carried
+        self.hx = np.where(carried, self.px[:, None], self.hx)
+        self.hy = np.where(carried, self.py[:, None] + 20, self.hy)
+
+        falling = alive & ~carried & self.falling
+        self.hvy = np.where(falling, self.hvy + 0.02, self.hvy)
+        self.hy = np.where(falling, self.hy + self.hvy, self.hy)
+        if falling.any():
+            ground = self.heights_at(self.hx)
+            landed = falling & (self.hy >= ground - 7)
+            self.hy[landed] = ground[landed] - 7
+            self.falling &= ~landed
+            self.hvy[landed] = 0
+            self.dead |= landed & (self.hy - self.fall_start_y > FALL_DAMAGE_DISTANCE)
+
+        dying = alive & ~carried & self.dead
+        self.death_timer += dying
+        self.h_alive &= ~(dying & (self.death_timer > 60))
+
+    def update_mutants(self):
+        mutants = self.e_alive & self.mutant
+        games, slots = np.nonzero(mutants)
+        if not len(games):
+            return
+        # Simple homing behavior
+        dx = self.px[games] - self.ex[games, slots]
+        dy = self.py[games] - self.ey[games, slots]
+        dist = hypot(dx, dy)
+        moving = dist > 0
+        games, slots, dx, dy, dist = games[moving], slots[moving], dx[moving], dy[moving], dist[moving]
+        self.ex[games, slots] += (dx / dist) * 4
+        self.ey[games, slots] += (dy / dist) * 4
+
+        # World wrapping
+        self.ex[mutants & (self.ex < 0)] = self.width
+        self.ex[mutants & (self.ex > self.width)] = 0
+        self.ey[mutants & (self.ey < 0)] = SCREEN_HEIGHT
+        self.ey[mutants & (self.ey > SCREEN_HEIGHT)] = 0
+
+    def update_landers(self):
+        rows = self.rows[:, None]
+        landers = self.e_alive & ~self.mutant
+        target = np.maximum(self.target, 0)
+        target_alive = (self.target >= 0) & self.h_alive[rows, target]
+
+        # STATE 1: ASCENDING
+        carrying = landers & self.has_humanoid & target_alive
+        dropping = landers & self.has_humanoid & ~target_alive
+        idle = landers & ~self.has_humanoid
+        self.has_humanoid &= ~dropping
+        self.target[dropping] = -1
+        self.ey = np.where(carrying, self.ey - 2, self.ey)
+        games, slots = np.nonzero(carrying)
+        if len(games):
+            held = self.target[games, slots]
+            self.hx[games, held] = self.ex[games, slots]
+            self.hy[games, held] = self.ey[games, slots] + 25
+
+        # STATE 2: targets were assigned at the start of the frame. Going
+        # through the landers in order, the first one to reach a humanoid
+        # abducts it, and any later lander after the same humanoid loses it
+        valid = idle & (self.target >= 0) & self.h_alive[rows, target] & ~self.abducted[rows, target]
+        dx = self.hx[rows, target] - self.ex
+        dy = self.hy[rows, target] - self.ey
+        grab = valid & (np.abs(dx) < 15) & (np.abs(dy) < 15)
+        winner = np.full(self.hx.shape, self.ex.shape[1], dtype=np.int64) # First grabbing slot per humanoid
+        games, slots = np.nonzero(grab)
+        np.minimum.at(winner, (games, self.target[games, slots]), slots)
+        slot_index = np.arange(self.ex.shape[1])[None, :]
+        pursuing = valid & (slot_index <= winner[rows, target])
+        self.target[idle & ~pursuing] = -1
+
+        # STATE 3a: PURSUE
+        self.ex = np.where(pursuing & (np.abs(dx) > 5), self.ex + np.where(dx > 0, 2.5, -2.5), self.ex)
+        self.ey = np.where(pursuing & (np.abs(dy) > 5), self.ey + np.where(dy > 0, 2.0, -2.0), self.ey)
+        won = pursuing & grab
+        self.has_humanoid |= won
+        games, slots = np.nonzero(won)
+        self.abducted[games, self.target[games, slots]] = True
+
+        # STATE 3b: WANDER
+        wandering = idle & ~pursuing
+        self.ex = np.where(wandering, self.ex + self.evx, self.ex)
+        self.ey = np.where(wandering, self.ey + self.evy, self.ey)
+        bounce_x = wandering & ((self.ex <= 0) | (self.ex >= self.width))
+        self.evx[bounce_x] *= -1
+        bounce_y = wandering & (self.ey <= 80)
+        self.evy[bounce_y] = np.abs(self.evy[bounce_y])
+
+        # Escaped to top: the humanoid is lost and a Mutant takes the Lander's place
+        games, slots = np.nonzero(carrying & (self.ey < 0))
+        if len(games):
+            self.h_alive[games, self.target[games, slots]] = False
+            self.e_alive[games, slots] = False
+            self.append_enemies(games, self.ex[games, slots], self.ey[games, slots], mutant=True)
+
+    def append_enemies(self, games, xs, ys, mutant, vxs=0.0, vys=0.0):
+        """Adds enemies after the last used slot of their games, in the order given."""
+        order = np.argsort(games, kind="stable")
+        games = games[order]
+        first = np.searchsorted(games, games) # Index of each game's first entry
+        slots = self.enemy_count[games] + np.arange(len(games)) - first
+        needed = int(slots.max()) + 1
+        if needed > self.ex.shape[1]:
+            self._grow(self.enemy_fields, max(needed, 2 * self.ex.shape[1]))
+        self.ex[games, slots] = np.asarray(xs, dtype=np.float64)[order]
+        self.ey[games, slots] = np.asarray(ys, dtype=np.float64)[order]
+        self.evx[games, slots] = np.broadcast_to(vxs, order.shape)[order]
+        self.evy[games, slots] = np.broadcast_to(vys, order.shape)[order]
+        self.e_alive[games, slots] = True
+        self.mutant[games, slots] = mutant
+        self.target[games, slots] = -1
+        self.has_humanoid[games, slots] = False
+        np.add.at(self.enemy_count, games, 1)
+
+    def update_lasers(self):
+        self.lx += self.lspeed
+        # Remove laser if it goes off-world
+        self.l_alive &= (self.lx >= -100) & (self.lx <= self.width + 100)
+
+    def update_camera(self):
+        target_x = self.px - SCREEN_WIDTH / 2
+        self.camera_x += (target_x - self.camera_x) * 0.1
+        self.camera_x = np.maximum(0, np.minimum(self.width - SCREEN_WIDTH, self.camera_x))
+
+    def enemy_halves(self):
+        half_w = np.where(self.mutant, self.mutant_half[0], self.lander_half[0])
+        half_h = np.where(self.mutant, self.mutant_half[1], self.lander_half[1])
+        return half_w, half_h
+
+    def collide_lasers(self):
+        """Each laser is spent on the first enemy (in spawn order) it touches; every enemy touched dies."""
+        games, lasers = np.nonzero(self.l_alive)
+        if not len(games):
+            return
+        half_w, half_h = self.enemy_halves()
+        # Lasers fly level, so the height test rules out most pairs before the
+        # costlier wrapped x test runs on the rest
+        level = self.e_alive[games] \
+            & (np.abs(self.ly[games, lasers][:, None] - self.ey[games]) < self.laser_half[1] + half_h[games])
+        pairs, enemies = np.nonzero(level)
+        g = games[pairs]
+        hit = self.box_dx(self.lx[g, lasers[pairs]], self.ex[g, enemies]) < self.laser_half[0] + half_w[g, enemies]
+        pairs = pairs[hit]
+        if not len(pairs):
+            return
+        # Pairs come sorted by laser then enemy: each laser's first pair is the enemy it is spent on
+        spent, first = np.unique(pairs, return_index=True)
+        self.l_alive[games[spent], lasers[spent]] = False
+        destroyed = np.zeros(self.e_alive.shape, dtype=bool)
+        destroyed[games[spent], enemies[hit][first]] = True
+        self.score += 150 * destroyed.sum(axis=1)
+
+        # Release humanoid if lander was carrying one
+        rows = self.rows[:, None]
+        target = np.maximum(self.target, 0)
+        carrying = destroyed & ~self.mutant & self.has_humanoid & (self.target >= 0) & self.h_alive[rows, target]
+        self.release(*np.nonzero(carrying))
+        self.e_alive &= ~destroyed
+
+    def collide_player(self):
+        vulnerable = ~self.invincible
+        half_w, half_h = self.enemy_halves()
+        hit = vulnerable[:, None] & self.e_alive \
+            & (self.box_dx(self.px[:, None], self.ex) < self.player_half[0] + half_w) \
+            & (np.abs(self.py[:, None] - self.ey) < self.player_half[1] + half_h)
+        crashed = hit.any(axis=1)
+        if not crashed.any():
+            return
+        self.e_alive &= ~hit
+        self.lives -= crashed
+        self.game_over |= crashed & (self.lives <= 0)
+
+        # No level reset, just respawn player
+        respawn = crashed & (self.lives > 0)
+        self.px[respawn] = self.camera_x[respawn] + SCREEN_WIDTH / 2
+        self.py[respawn] = SCREEN_HEIGHT / 2
+        self.pvx[respawn] = 0
+        self.pvy[respawn] = 0
+        self.invincible |= respawn
+        self.invincible_timer[respawn] = 120
+
+    def catch_humanoids(self):
+        carrying = self.carried >= 0
+        ground = self.heights_at(self.px)
+
+        # Safe delivery
+        delivered = np.flatnonzero(carrying & (self.py >= ground - 10))
+        if len(delivered):
+            held = self.carried[delivered]
+            self.h_carried[delivered, held] = False
+            self.hy[delivered, held] = ground[delivered] - 8
+            self.carried[delivered] = -1
+            self.score[delivered] += 1000
+
+        # The first falling humanoid within reach is caught
+        games, slots = np.nonzero(~carrying[:, None] & self.h_alive & self.falling)
+        if not len(games):
+            return
+        dx = self.wrapped_dx(self.px[games], self.hx[games, slots])
+        close = hypot(dx, self.py[games] - self.hy[games, slots]) < CATCH_DISTANCE
+        reach = np.zeros(self.hx.shape, dtype=bool)
+        reach[games[close], slots[close]] = True
+        caught = np.flatnonzero(reach.any(axis=1))
+        if len(caught):
+            slots = np.argmax(reach[caught], axis=1)
+            self.falling[caught, slots] = False
+            self.h_carried[caught, slots] = True
+            self.hvy[caught, slots] = 0
+            self.carried[caught] = slots
+
+    def spawn_landers(self):
+        """Two new landers for every game left with fewer than three enemies."""
+        games = np.flatnonzero(self.e_alive.sum(axis=1) < 3)
+        if not len(games):
+            return
+        games = np.repeat(games, 2)
+        spawned = np.empty((len(games), 4))
+        width = self.width
+        for k, i in enumerate(games.tolist()):
+            rng = self.rngs[i] # The same draws Lander.__init__ makes
+            spawned[k] = (rng.randint(0, width), rng.randint(80, 200), rng.uniform(-2, 2), rng.uniform(0.5, 1.5))
+        self.append_enemies(games, spawned[:, 0], spawned[:, 1], False, spawned[:, 2], spawned[:, 3])
+
+    def compact_enemies(self):
+        """Closes the gaps left by dead enemies, keeping spawn order."""
+        alive = self.e_alive
+        count = alive.sum(axis=1)
+        if np.array_equal(count, self.enemy_count):
+            return
+        order = np.argsort(~alive, axis=1, kind="stable")
+        for name in self.enemy_fields:
+            setattr(self, name, np.take_along_axis(getattr(self, name), order, axis=1))
+        self.enemy_count = count
+
+    # --- Observations ---
+    def observe(self, out=None):
+        """Writes each game's feature vector into `out` (n x OBSERVATION_SIZE float32)."""
+        if out is None:
+            out = np.empty((self.n, OBSERVATION_SIZE), dtype=np.float32)
+        out[:, 0] = self.px / self.width
+        out[:, 1] = self.py / SCREEN_HEIGHT
+        out[:, 2] = self.pvx / 8
+        out[:, 3] = self.pvy / 8
+        out[:, 4] = np.where(self.facing_right, 1.0, -1.0)
+        out[:, 5] = self.lives / 3
+        out[:, 6] = self.bombs / 3
+        out[:, 7] = self.carried >= 0
+        out[:, 8] = self.invincible
+        out[:, 9] = self.camera_x / self.width
+
+        start = PLAYER_FEATURES
+        rows = self.rows[:, None]
+        target = np.maximum(self.target, 0)
+        carrying = self.has_humanoid & (self.target >= 0) & self.h_alive[rows, target]
+        self._nearest(out[:, start:start + NEAREST_ENEMIES * ENEMY_FEATURES], NEAREST_ENEMIES,
+                      self.ex, self.ey, self.e_alive, (self.mutant, carrying))
+        start += NEAREST_ENEMIES * ENEMY_FEATURES
+        self._nearest(out[:, start:], NEAREST_HUMANOIDS,
+                      self.hx, self.hy, self.h_alive, (self.falling, self.abducted))
+        return out
+
+    def scan(self, out=None):
+        """Writes each game's scanner grid into `out` (n x SCAN_CHANNELS x SCAN_ROWS x SCAN_COLUMNS float32)."""
+        if out is None:
+            out = np.empty((self.n,) + OBSERVATION_SHAPES["scanner"], dtype=np.float32)
+        cells = []
+        for channel, games, xs, ys in (
+            (0, self.rows, self.px, self.py),
+            (1,) + self._live(self.e_alive, self.ex, self.ey),
+            (2,) + self._live(self.h_alive, self.hx, self.hy),
+        ):
+            columns = np.clip((xs * (SCAN_COLUMNS / self.width)).astype(np.int64), 0, SCAN_COLUMNS - 1)
+            rows = np.clip(((ys - 60) * (SCAN_ROWS / PLAYABLE_HEIGHT)).astype(np.int64), 0, SCAN_ROWS - 1)
+            cells.append(((games * SCAN_CHANNELS + channel) * SCAN_ROWS + rows) * SCAN_COLUMNS + columns)
+        counts = np.bincount(np.concatenate(cells), minlength=out.size)
+        out.reshape(-1)[:] = counts
+        return out
+
+    def _live(self, alive, xs, ys):
+        games, slots = np.nonzero(alive)
+        return games, xs[games, slots], ys[games, slots]
+
+    def _nearest(self, out, k, xs, ys, alive, flags):
+        """Fills `out` with (dx, dy, *flags, present) of the k nearest live entities per game."""
+        dx = self.wrapped_dx(xs, self.px[:, None])
+        dy = ys - self.py[:, None]
+        dist = np.where(alive, dx * dx + dy * dy, np.inf)
+        if dist.shape[1] < k:
+            pad = k - dist.shape[1]
+            dist = np.pad(dist, ((0, 0), (0, pad)), constant_values=np.inf)
+            dx = np.pad(dx, ((0, 0), (0, pad)))
+            dy = np.pad(dy, ((0, 0), (0, pad)))
+            flags = [np.pad(f, ((0, 0), (0, pad))) for f in flags]
+        elif dist.shape[1] > k:
+            nearest = np.argpartition(dist, k - 1, axis=1)[:, :k]
+            dist = np.take_along_axis(dist, nearest, axis=1)
+            dx = np.take_along_axis(dx, nearest, axis=1)
+            dy = np.take_along_axis(dy, nearest, axis=1)
+            flags = [np.take_along_axis(f, nearest, axis=1) for f in flags]
+        order = np.argsort(dist, axis=1)
+        present = np.isfinite(np.take_along_axis(dist, order, axis=1))
+        view = out.reshape(self.n, k, -1)
+        view[:, :, 0] = np.where(present, np.take_along_axis(dx, order, axis=1) / SCREEN_WIDTH, 0)
+        view[:, :, 1] = np.where(present, np.take_along_axis(dy, order, axis=1) / SCREEN_HEIGHT, 0)
+        for j, f in enumerate(flags, 2):
+            view[:, :, j] = present & np.take_along_axis(f, order, axis=1)
+        view[:, :, -1] = present
+
+class VectorDefenderEnv:
+    """Gym-style vector environment over a WorldBatch.
+
+    `reset` returns (observations, infos) and `step` returns (observations,
+    rewards, terminated, truncated, infos), one row per game. Each game's
+    seed comes from `seed`, so a run is reproducible; infos["seed"] tells
+    which World an episode was. `max_steps` cuts episodes short (truncated).
+
+    `observation` picks "features" (OBSERVATION_SIZE floats) or "scanner"
+    (a SCAN_CHANNELS x SCAN_ROWS x SCAN_COLUMNS grid). Pass an `observations`
+    array (e.g. over shared memory) to have them written there; it is then
+    returned as is rather than copied, and is overwritten by the next step.
+    """
+    num_actions = NUM_ACTIONS
+
+    def __init__(self, num_envs, seed=None, max_steps=None, observation="features", observations=None,
+                 **world_options):
+        self.num_envs = num_envs
+        self.max_steps = max_steps
+        self.observation = observation
+        self.observation_shape = OBSERVATION_SHAPES[observation]
+        self.batch = WorldBatch(num_envs, **world_options)
+        self.seed_rng = np.random.default_rng(seed)
+        self.shared = observations is not None
+        if observations is None:
+            observations = np.empty((num_envs,) + self.observation_shape, dtype=np.float32)
+        self.observations = observations
+        self.episode_steps = np.zeros(num_envs, dtype=np.int64)
+        self.episode_returns = np.zeros(num_envs, dtype=np.int64)
+
+    def reset(self, seed=None):
+        if seed is not None:
+            self.seed_rng = np.random.default_rng(seed)
+        for i in range(self.num_envs):
+            self.reset_game(i)
+        return self.observe(), {"seed": self.batch.seeds.copy()}
+
+    def observe(self):
+        if self.observation == "scanner":
+            self.batch.scan(self.observations)
+        else:
+            self.batch.observe(self.observations)
+        return self.observations if self.shared else self.observations.copy()
+
+    def reset_game(self, i):
+        self.batch.reset(i, int(self.seed_rng.integers(2**31)))
+        self.episode_steps[i] = 0
+        self.episode_returns[i] = 0
+
+    def step(self, actions):
+        batch = self.batch
+        score = batch.score.copy()
+        batch.step(actions)
+        rewards = (batch.score - score).astype(np.float32)
+        self.episode_steps += 1
+        self.episode_returns += batch.score - score
+        terminated = batch.game_over.copy()
+        if self.max_steps is not None:
+            truncated = ~terminated & (self.episode_steps >= self.max_steps)
+        else:
+            truncated = np.zeros(self.num_envs, dtype=bool)
+
+        infos = {"seed": batch.seeds.copy()}
+        finished = np.flatnonzero(terminated | truncated)
+        if len(finished):
+            infos["final_observation"] = self.observe()[finished]
+            infos["finished"] = finished
+            infos["episode_return"] = self.episode_returns[finished].copy()
+            infos["episode_length"] = self.episode_steps[finished].copy()
+            for i in finished.tolist():
+                self.reset_game(i)
+        return self.observe(), rewards, terminated, truncated, infos
@@ -0,0 +1,168 @@
+"""Waves of enemies, released over time and spawned under a per-frame budget.
+
+A wave says how many of each enemy type it brings, how many arrive at once
+when it starts and how often the rest follow. Released enemies wait in a
+queue and are spawned a few at a time, so a big wave trickles in over a
+handful of frames instead of all landing in one. Past the end of WAVES
+the last wave keeps growing. Between waves the director pre-warms what the
+next one needs: EntityStore rows, and the atlas images a headless World
+would otherwise build on first use.
+"""
+
+SPAWN_BUDGET = 2 # Spawn cost (see EnemyType) the director may spend per frame
+INTERMISSION = 120 # Frames between clearing a wave and the next one starting
+GROWTH = 0.25 # Extra enemies per wave past the table, as a fraction of the last wave
+MIN_INTERVAL = 10 # Fastest release rate the ramp goes to, in frames
+
+# --- Definitions ---
+class EnemyType:
+    """How the director makes one kind of enemy."""
+    def __init__(self, spawn, image_key, table=None, cost=1):
+        self.spawn = spawn # function(world) -> the new enemy
+        self.image_key = image_key # Atlas image to build before the first one arrives
+        self.table = table # EntityStore table to reserve rows in, if the type has one
+        self.cost = cost
+
+def spawn_mutant(world):
+    # Well away from the player, so a homing Mutant never appears on top of them
+    x = (world.player.world_x + world.rng.uniform(0.25, 0.75) * world.width) % world.width
+    return world.spawn_mutant(x, world.rng.randint(80, 200))
+
+ENEMY_TYPES = {
+    "lander": EnemyType(lambda world: world.spawn_lander(), "lander", "landers"),
+    "mutant": EnemyType(spawn_mutant, "mutant", "mutants"),
+}
+
+class Wave:
+    """One wave: enemy counts by type, the opening burst and the release interval for the rest."""
+    def __init__(self, enemies, opening=6, interval=60, humanoids=0):
+        self.enemies = dict(enemies)
+        self.opening = opening # Released as soon as the wave starts
+        self.interval = interval # Frames between later releases
+        self.humanoids = humanoids # Added to the ground when the wave starts
+
+    def __len__(self):
+        return sum(self.enemies.values())
+
+    def release_order(self):
+        """The enemy type of every spawn in arrival order, each type spread evenly through the wave."""
+        slots = [((i + 0.5) / count, k, kind)
+                 for k, (kind, count) in enumerate(self.enemies.items()) for i in range(count)]
+        return [kind for _, _, kind in sorted(slots)]
+
+WAVES = [
+    Wave({"lander": 6}, opening=6, interval=90),
+    Wave({"lander": 10}, opening=6, interval=60),
+    Wave({"lander": 12, "mutant": 2}, opening=8, interval=60),
+    Wave({"lander": 15, "mutant": 4}, opening=8, interval=45),
+    Wave({"lander": 18, "mutant": 6}, opening=10, interval=40, humanoids=5),
+]
+
+def wave_definition(number, waves=WAVES):
+    """Wave `number` (from 1): from the table, or the last one scaled up, restocking humanoids every 5th."""
+    if number <= len(waves):
+        return waves[number - 1]
+    last = waves[-1]
+    extra = number - len(waves)
+    scale = 1 + GROWTH * extra
+    return Wave({kind: round(count * scale) for kind, count in last.enemies.items()},
+                opening=round(last.opening * scale),
+                interval=max(MIN_INTERVAL, int(last.interval * 0.9 ** extra)),
+                humanoids=last.humanoids if number % 5 == 0 else 0)
+
+# --- Director ---
+class WaveDirector:
+    """Runs the waves for one World; call `update` once per step.
+
+    All of its state is a handful of counters (the queue is the slice of
+    the release order between `spawned` and `released`), so snapshots can
+    store it and the World stays deterministic: the budget is counted in
+    spawn cost, not wall time.
+    """
+    def __init__(self, waves=WAVES, types=ENEMY_TYPES, budget=SPAWN_BUDGET, intermission=INTERMISSION, atlas=None):
+        self.waves = waves
+        self.types = types
+        self.atlas = atlas # SpriteAtlas holding the enemies' images, for prewarm
+        self.budget = budget
+        self.intermission_frames = intermission
+        self.number = 0
+        self.wave = None
+        self.order = []
+        self.released = 0 # Spawns let out of the wave so far
+        self.spawned = 0 # Spawns actually made
+        self.timer = 0 # Frames until the next release
+        self.intermission = 0 # Frames left before the next wave; 0 while one is running
+        self.last_spawns = 0 # Spawned in the latest update
+
+    def definition(self, number):
+        return wave_definition(number, self.waves)
+
+    def start(self, world, number):
+        """Begins wave `number`: its opening burst is queued right away."""
+        self.set_wave(number)
+        wave = self.wave
+        self.released = min(wave.opening, len(self.order))
+        self.spawned = 0
+        self.timer = wave.interval
+        self.intermission = 0
+        for _ in range(wave.humanoids):
+            world.spawn_humanoid()
+        self.prewarm(world, wave) # Already done in the intermission, unless this is the first wave
+
+    def set_wave(self, number):
+        self.number = number
+        self.wave = self.definition(number)
+        self.order = self.wave.release_order()
+
+    def update(self, world):
+        self.last_spawns = 0
+        if self.intermission:
+            self.intermission -= 1
+            if not self.intermission:
+                self.start(world, self.number + 1)
+            return
+
+        order = self.order
+        if self.released < len(order):
+            self.timer -= 1
+            if self.timer <= 0:
+                self.released += 1
+                self.timer = self.wave.interval
+
+        # Work through the queue; one spawn always fits, however costly
+        budget = self.budget
+        types = self.types
+        while self.spawned < self.released:
+            enemy_type = types[order[self.spawned]]
+            if enemy_type.cost > budget and budget < self.budget:
+                break
+            budget -= enemy_type.cost
+            enemy_type.spawn(world)
+            self.spawned += 1
+            self.last_spawns += 1
+
+        if self.spawned == len(order) and not world.enemies:
+            self.intermission = max(self.intermission_frames, 1)
+            self.prewarm(world, self.definition(self.number + 1))
+
+    def prewarm(self, world, wave):
+        """Reserves the EntityStore rows the wave's enemies need and builds their atlas images.
+
+        A sprite-mode spawn allocates only the sprite itself, so without the
+        store this just builds images; a Renderer has already built them all
+        (SpriteAtlas.convert), so in the game it costs nothing.
+        """
+        for kind, count in wave.enemies.items():
+            enemy_type = self.types[kind]
+            if self.atlas is not None:
+                self.atlas[enemy_type.image_key] # Built on first use otherwise, mid-wave
+            if world.store is not None and enemy_type.table:
+                table = getattr(world.store, enemy_type.table)
+                table.reserve(table.count + count)
+
+    def progress(self, world):
+        """How much of the current wave is dealt with, 0 to 1 (1 during an intermission)."""
+        if self.intermission or not self.order:
+            return 1.0
+        remaining = len(self.order) - self.spawned + len(world.enemies) # Escaped Landers' Mutants count too
+        return max(0.0, 1 - remaining / len(self.order))